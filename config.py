@@ -2,6 +2,7 @@
 GRID_WIDTH = 60  # Number of cells in width
 GRID_HEIGHT = 30  # Number of cells in height
 CELL_SIZE = 30  # Size of each cell in pixels
+SQUARE_SIZE = CELL_SIZE  # Alias used by the graphics sprite classes
 
 # Initial Population
 INITIAL_PLANTS = 15
@@ -40,8 +41,16 @@ REPRODUCTION_COOLDOWNS = {
     'omnivore': 5
 }
 
-# Update Timing
-UPDATE_INTERVAL = 1000  # Milliseconds between updates
+# Event logging (see engine/events.py)
+EVENT_LOG_LEVEL = 'info'  # 'debug' also logs the move of every animal on every step
+EVENT_CATEGORIES = ['birth', 'death', 'predation', 'feeding', 'movement']
+
+# Snapshots (see engine/snapshot.py)
+SNAPSHOT_INTERVAL = 50  # Steps between world snapshots when snapshots are enabled
+
+# Display (see graphics/renderer.py)
+TARGET_FPS = 30  # Window refreshes per second, the simulation runs at full speed regardless
+SPLASH_SCREENS = True  # Show a message for a second before and after every simulation
 
 # Colors
 WHITE = (255, 255, 255)
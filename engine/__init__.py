@@ -0,0 +1,2 @@
+# Headless simulation core. Nothing in this package imports pygame, so it can
+# be used for training runs, tooling and tests without a display.
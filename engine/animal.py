@@ -0,0 +1,52 @@
+from config import REPRODUCTION_COOLDOWNS
+# Action and possible_actions are re-exported, they used to live here
+from engine.genome import Action, possible_actions, as_genome, random_genome, mix_genomes
+
+__all__ = ['Action', 'possible_actions', 'generate_random_genes', 'mix_genes', 'Animal']
+
+
+def generate_random_genes(animal_type, rng=None):
+    """Generate random genes for all possible vision configurations"""
+    return random_genome(animal_type, rng)
+
+
+def mix_genes(animal_type, parent1_genes, parent2_genes, rng=None):
+    """Mix genes from two parents with mutation chance"""
+    return mix_genomes(animal_type, parent1_genes, parent2_genes, rng)
+
+
+class Animal:
+    def __init__(self, x, y, animal_type, is_offspring=False, genes=None):
+        self.x = x
+        self.y = y
+        self.animal_type = animal_type
+        self.genes = as_genome(animal_type, genes) if genes else self.generate_random_genes()
+        self.reproduction_cooldown = REPRODUCTION_COOLDOWNS[animal_type] if is_offspring else 0
+        self.hunger = 0
+        self.age = 0
+        self.stationary_count = 0
+        # Add fitness tracking (survival is scored by the grid's ledger)
+        self.offspring_count = 0
+        # Row of the animal in its grid's engine.ledger.Ledger
+        self.lifetime = -1
+
+    def generate_random_genes(self):
+        """Generate random genes for all possible vision configurations"""
+        return generate_random_genes(self.animal_type)
+    
+    def get_vision_key(self, vision_dict):
+        """Convert vision distances to a key for gene lookup"""
+        return (
+            round(vision_dict.get('plant', 0)),
+            round(vision_dict.get('herbivore', 0)),
+            round(vision_dict.get('omnivore', 0)),
+            round(vision_dict.get('carnivore', 0))
+        )
+
+    def feed(self):
+        """Reset hunger when animal eats"""
+        self.hunger = 0
+
+    def mix_genes(self, parent1_genes, parent2_genes, rng=None):
+        """Mix genes from two parents with mutation chance"""
+        return mix_genes(self.animal_type, parent1_genes, parent2_genes, rng)
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import contextlib
+from datetime import datetime
+
+import numpy as np
+
+from config import ANIMAL_TYPES, INITIAL_HERBIVORES, INITIAL_CARNIVORES, INITIAL_OMNIVORES, VISION_RADIUS
+from engine.genome import random_genome
+from engine.animal import mix_genes
+from engine.ensemble import run_ensemble
+from engine.metrics import StepMetrics
+from engine.simulation import create_grid, run_simulation
+
+RESULTS_VERSION = 1
+
+# Backends of create_grid, and the ones run_simulation is timed on
+BACKENDS = ('grid', 'array', 'batched', 'chunked')
+SIMULATION_BACKENDS = BACKENDS + ('ensemble',)
+
+# (width, height) of the benchmark worlds
+SIZES = [(30, 15), (60, 30), (120, 60)]
+# Share of the cells holding an animal; the default world starts at about 0.2
+DENSITIES = {'sparse': 0.05, 'default': 0.2, 'dense': 0.4}
+# Share of the cells holding a plant, about what a run settles at
+PLANT_DENSITY = 0.3
+# Animals are split between the species like in the default world
+SPECIES_SHARES = {'herbivore': INITIAL_HERBIVORES, 'carnivore': INITIAL_CARNIVORES, 'omnivore': INITIAL_OMNIVORES}
+
+STEPS = 10  # Steps timed by the update_plants and update_animals benchmarks
+MIXES = 2000  # Gene mixes timed per species
+ENSEMBLE_SIZE = 8  # Simulations stepped together by the ensemble benchmark
+THRESHOLD = 0.1  # Slowdown flagged as a regression by compare
+MIN_SAMPLE_TIME = 0.05  # Seconds every timed sample lasts at least
+
+
+def populated_grid(backend, width, height, density, seed=0):
+    """A world with PLANT_DENSITY plants and `density` animals on distinct cells"""
+    grid = create_grid(width, height, backend, seed=seed)
+    cells = grid.rng.generator.permutation(width * height).tolist()
+    plant_count = int(PLANT_DENSITY * width * height)
+    for cell in cells[:plant_count]:
+        grid.add_plant(cell % width, cell // width)
+
+    free_cells = iter(cells[plant_count:])
+    animal_count = int(density * width * height)
+    total_share = sum(SPECIES_SHARES.values())
+    for animal_type, share in SPECIES_SHARES.items():
+        for _ in range(max(1, animal_count * share // total_share)):
+            cell = next(free_cells)
+            grid.add_animal(cell % width, cell // width, animal_type)
+    return grid
+
+
+def copy_grid(grid):
+    """An independent copy, so every repeat starts from the same world"""
+    return pickle.loads(pickle.dumps(grid, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def best_time(function, repeat):
+    """Wall time of one call, the best of `repeat` samples
+
+    Like timeit, every sample repeats the call until it lasts at least
+    MIN_SAMPLE_TIME, so fast functions are not lost in timer noise.
+    """
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    number = max(1, int(MIN_SAMPLE_TIME / first)) if first else 1000
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def result(benchmark, unit, operations, seconds, **params):
+    return {'benchmark': benchmark, **params, 'operations': operations,
+            'seconds': seconds, 'unit': unit, 'rate': operations / seconds if seconds else 0.0}
+
+
+def bench_vision(grid, repeat, **params):
+    """get_vision of every animal of a species, with the vision cache cleared"""
+    results = []
+    for animal_type in ANIMAL_TYPES:
+        positions = sorted(getattr(grid, f'{animal_type}s'))
+
+        def run():
+            if getattr(grid, 'vision_cache', None) is not None:
+                grid.vision_cache.clear()
+            for x, y in positions:
+                grid.get_vision(x, y, animal_type)
+
+        results.append(result('get_vision', 'calls/s', len(positions), best_time(run, repeat),
+                              animal_type=animal_type, radius=VISION_RADIUS[animal_type], **params))
+    return results
+
+
+def bench_find_closest(grid, repeat, **params):
+    """find_closest_of_type from every animal of a species to every kind of target"""
+    results = []
+    targets = ['plant'] + list(ANIMAL_TYPES)
+    for animal_type in ANIMAL_TYPES:
+        positions = sorted(getattr(grid, f'{animal_type}s'))
+
+        def run():
+            for x, y in positions:
+                for target_type in targets:
+                    grid.find_closest_of_type(x, y, None, target_type)
+
+        results.append(result('find_closest_of_type', 'calls/s', len(positions) * len(targets),
+                              best_time(run, repeat), animal_type=animal_type,
+                              radius=VISION_RADIUS[animal_type], **params))
+    return results
+
+
+def bench_steps(grid, method, repeat, **params):
+    """STEPS calls of grid.update_plants or grid.update_animals on a fresh copy"""
+    def run():
+        world = copy_grid(grid)
+        update = getattr(world, method)
+        for _ in range(STEPS):
+            update()
+
+    # Copying is part of every repeat, time it separately and leave it out
+    copy_time = best_time(lambda: copy_grid(grid), repeat)
+    return [result(method, 'steps/s', STEPS, max(best_time(run, repeat) - copy_time, 1e-9), **params)]
+
+
+def bench_mix_genes(repeat):
+    """Animal.mix_genes of two random parents, per species"""
+    results = []
+    rng = np.random.default_rng(0)
+    for animal_type in ANIMAL_TYPES:
+        parent1, parent2 = random_genome(animal_type, rng), random_genome(animal_type, rng)
+
+        def run():
+            for _ in range(MIXES):
+                mix_genes(animal_type, parent1, parent2, rng)
+
+        results.append(result('mix_genes', 'mixes/s', MIXES, best_time(run, repeat),
+                              animal_type=animal_type, genes=len(parent1)))
+    return results
+
+
+class StepCounter:
+    """Stands in for a renderer to count the steps run_simulation ran"""
+
+    def __init__(self):
+        self.steps = 0
+
+    def show_message(self, text, wait_ms=1000):
+        pass
+
+    def draw(self, grid, generation, simulation, step, force=False):
+        self.steps = max(self.steps, step + 1)
+
+
+def bench_run_simulation(backend, repeat, seed=0):
+    """A full headless run_simulation of the default world"""
+    counter = StepCounter()
+
+    def run():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            run_simulation(renderer=counter, backend=backend, seed=seed)
+
+    seconds = best_time(run, repeat)
+    return [result('run_simulation', 'steps/s', counter.steps, seconds, backend=backend)]
+
+
+def bench_run_ensemble(repeat, seed=0, count=ENSEMBLE_SIZE):
+    """`count` default worlds run as one engine.ensemble.Ensemble, in
+    simulation steps per second"""
+    metrics = StepMetrics()
+
+    def run():
+        metrics.steps.clear()
+        run_ensemble(count, seed=seed, metrics=metrics)
+
+    seconds = best_time(run, repeat)
+    return [result('run_simulation', 'steps/s', len(metrics.steps) * count, seconds, backend='ensemble',
+                   simulations=count)]
+
+
+def run_benchmarks(backends=BACKENDS, sizes=SIZES, densities=DENSITIES, repeat=3,
+                   simulation_backends=SIMULATION_BACKENDS, progress=None):
+    """Run every benchmark and return the results as a JSON-ready dict
+
+    The micro benchmarks run on every backend, world size and animal
+    density, and a full run_simulation on every simulation backend,
+    'ensemble' included. The vision benchmarks run per species, which covers all three
+    vision radii. Every result carries its rate in `unit` (calls, mixes or
+    steps per second), larger is better.
+    """
+    results = []
+
+    def add(new_results):
+        results.extend(new_results)
+        if progress:
+            for entry in new_results:
+                progress(entry)
+
+    for backend in backends:
+        for width, height in sizes:
+            for density_name, density in densities.items():
+                params = {'backend': backend, 'size': f'{width}x{height}', 'density': density_name}
+                grid = populated_grid(backend, width, height, density)
+                add(bench_vision(grid, repeat, **params))
+                add(bench_find_closest(grid, repeat, **params))
+                add(bench_steps(grid, 'update_plants', repeat, **params))
+                add(bench_steps(grid, 'update_animals', repeat, **params))
+    add(bench_mix_genes(repeat))
+    for backend in simulation_backends:
+        add(bench_run_ensemble(1) if backend == 'ensemble' else bench_run_simulation(backend, 1))
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.platform(),
+        'results': results,
+    }
+
+
+def result_key(entry):
+    """What identifies a measurement across runs: everything but the timings"""
+    return tuple(sorted((name, value) for name, value in entry.items()
+                        if name not in ('operations', 'seconds', 'rate', 'unit')))
+
+
+def describe(entry):
+    params = ' '.join(str(value) for name, value in entry.items()
+                      if name not in ('benchmark', 'operations', 'seconds', 'rate', 'unit'))
+    return f"{entry['benchmark']} {params}"
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """Match results against a baseline
+
+    Returns (regressions, improvements), lists of (entry, baseline rate,
+    current rate) for every rate that dropped or rose by more than
+    `threshold`.
+    """
+    baseline_rates = {result_key(entry): entry['rate'] for entry in baseline['results']}
+    regressions, improvements = [], []
+    for entry in current['results']:
+        old_rate = baseline_rates.get(result_key(entry))
+        if not old_rate:
+            continue
+        change = entry['rate'] / old_rate - 1
+        if change < -threshold:
+            regressions.append((entry, old_rate, entry['rate']))
+        elif change > threshold:
+            improvements.append((entry, old_rate, entry['rate']))
+    return regressions, improvements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation core")
+    parser.add_argument('--output', metavar='FILE', help="Write the results as JSON")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="Flag rates that dropped against a results file; exits with 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Relative slowdown counted as a regression")
+    parser.add_argument('--backends', nargs='+', default=list(SIMULATION_BACKENDS), choices=SIMULATION_BACKENDS,
+                        help="Backends to time ('ensemble' only runs whole simulations)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed repeats, the best one counts")
+    parser.add_argument('--quick', action='store_true', help="Only the default world size and density")
+    args = parser.parse_args(argv)
+
+    sizes, densities = SIZES, DENSITIES
+    if args.quick:
+        sizes, densities = [(60, 30)], {'default': DENSITIES['default']}
+
+    def progress(entry):
+        print(f"{describe(entry)}: {entry['rate']:,.0f} {entry['unit']}")
+
+    backends = [backend for backend in args.backends if backend != 'ensemble']
+    report = run_benchmarks(backends, sizes, densities, args.repeat,
+                            simulation_backends=args.backends, progress=progress)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions, improvements = compare(baseline, report, args.threshold)
+        for title, entries in (('Improvements', improvements), ('Regressions', regressions)):
+            print(f"\n{title} over {args.threshold:.0%} against {args.compare}: {len(entries)}")
+            for entry, old_rate, new_rate in entries:
+                print(f"  {describe(entry)}: {old_rate:,.0f} -> {new_rate:,.0f} {entry['unit']} "
+                      f"({new_rate / old_rate - 1:+.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+from config import VISION_RADIUS
+from engine.animal import Animal
+from engine.grid import Grid
+from engine.stencils import vision_stencil
+
+# Chunks are CHUNK_SIZE x CHUNK_SIZE cells, a power of two so the chunk of a
+# cell and its place in the chunk are a shift and a mask away
+CHUNK_BITS = 4
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_SIZE - 1
+
+
+class ChunkRow:
+    """One row of a ChunkedGrid, indexed like a row of Grid.grid"""
+
+    __slots__ = ('world', 'y')
+
+    def __init__(self, world, y):
+        self.world = world
+        self.y = y
+
+    def __getitem__(self, x):
+        return self.world.cell(x, self.y)
+
+    def __setitem__(self, x, value):
+        self.world.set_cell(x, self.y, value)
+
+
+class ChunkedGrid(Grid):
+    """Grid backend for very large, mostly empty maps.
+
+    The cells live in CHUNK_SIZE x CHUNK_SIZE chunks, flat row-major lists
+    found through a directory with one slot per chunk. A chunk is allocated
+    when something is put into one of its cells and freed when its last cell
+    is cleared, so memory, snapshots and restoring a snapshot follow the
+    occupied area instead of width * height (the directory costs one slot
+    per CHUNK_SIZE * CHUNK_SIZE cells). Everything else is Grid's: there is
+    no per-chunk activity tracking, as the simulation already visits only
+    the animal sets and the plant frontier rather than the map. grid[y][x]
+    reads and writes go through ChunkRow, and the vision scans, which touch
+    the most cells, read the chunks directly.
+
+    The results are the same as Grid's for the same seed.
+    """
+
+    def __init__(self, width, height, vision_cache=False, events=None, seed=None):
+        self.chunk_columns = (width + CHUNK_MASK) >> CHUNK_BITS
+        chunk_count = self.chunk_columns * ((height + CHUNK_MASK) >> CHUNK_BITS)
+        self.chunks = [None] * chunk_count  # chunk_y * chunk_columns + chunk_x -> cells or None
+        self.filled = [0] * chunk_count  # Cells that are not None, per chunk
+        super().__init__(width, height, vision_cache, events, seed)
+
+    def __getstate__(self):
+        """Snapshots hold the allocated chunks, the rows are rebuilt on restore"""
+        state = super().__getstate__()
+        state['grid'] = None
+        return state
+
+    def __setstate__(self, state):
+        state['grid'] = [ChunkRow(self, y) for y in range(state['height'])]
+        super().__setstate__(state)
+
+    def new_cells(self):
+        return [ChunkRow(self, y) for y in range(self.height)]
+
+    def cell(self, x, y):
+        """What grid[y][x] holds: None, PLANT_TYPE or an Animal"""
+        chunk = self.chunks[(y >> CHUNK_BITS) * self.chunk_columns + (x >> CHUNK_BITS)]
+        if chunk is None:
+            return None
+        return chunk[(y & CHUNK_MASK) << CHUNK_BITS | x & CHUNK_MASK]
+
+    def set_cell(self, x, y, value):
+        """Store value in grid[y][x], allocating or freeing its chunk as needed"""
+        key = (y >> CHUNK_BITS) * self.chunk_columns + (x >> CHUNK_BITS)
+        chunk = self.chunks[key]
+        if chunk is None:
+            if value is None:
+                return
+            chunk = self.chunks[key] = [None] * (CHUNK_SIZE * CHUNK_SIZE)
+        index = (y & CHUNK_MASK) << CHUNK_BITS | x & CHUNK_MASK
+        self.filled[key] += (value is not None) - (chunk[index] is not None)
+        chunk[index] = value
+        if not self.filled[key]:
+            self.chunks[key] = None
+
+    def cell_type(self, x, y):
+        cell = self.cell(x, y)
+        if isinstance(cell, Animal):
+            return cell.animal_type
+        return cell
+
+    def is_empty(self, x, y):
+        """Check if position is valid and has no animals (plants are ok)"""
+        return self.is_valid_position(x, y) and not isinstance(self.cell(x, y), Animal)
+
+    def is_empty_for_plant(self, x, y):
+        """Check if position is valid and has no plant (animals are ok)"""
+        if not self.is_valid_position(x, y):
+            return False
+        cell = self.cell(x, y)
+        return cell is None or isinstance(cell, Animal)
+
+    def has_animal(self, x, y):
+        """Check if position has an animal"""
+        return self.is_valid_position(x, y) and isinstance(self.cell(x, y), Animal)
+
+    def animal_at(self, x, y):
+        """Return the animal at a position, or None"""
+        cell = self.cell(x, y)
+        return cell if isinstance(cell, Animal) else None
+
+    def scan_vision(self, x, y, animal_type):
+        """Walk the distance-ordered vision stencil until every type is found,
+        see Grid.scan_vision"""
+        vision = {'plant': 0, 'herbivore': 0, 'omnivore': 0, 'carnivore': 0}
+        missing = len(vision)
+        chunks = self.chunks
+        columns = self.chunk_columns
+        width, height = self.width, self.height
+        bits, mask = CHUNK_BITS, CHUNK_MASK
+
+        for distance, dx, dy, before_center in vision_stencil(VISION_RADIUS[animal_type]):
+            new_x, new_y = x + dx, y + dy
+            if not (0 <= new_x < width and 0 <= new_y < height):
+                continue
+
+            chunk = chunks[(new_y >> bits) * columns + (new_x >> bits)]
+            if chunk is None:
+                continue
+            cell = chunk[(new_y & mask) << bits | new_x & mask]
+            if cell is None:
+                continue
+            cell_type = cell.animal_type if isinstance(cell, Animal) else cell
+
+            if vision[cell_type] == 0 and not (before_center and cell_type == animal_type):
+                vision[cell_type] = distance
+                missing -= 1
+                if not missing:
+                    break
+
+        return vision
+
+    def scan_closest_of_type(self, x, y, target_type, stencil):
+        """Walk a distance-ordered stencil and return the first target_type hit"""
+        chunks = self.chunks
+        columns = self.chunk_columns
+        width, height = self.width, self.height
+        bits, mask = CHUNK_BITS, CHUNK_MASK
+        for _, dx, dy, _ in stencil:
+            new_x, new_y = x + dx, y + dy
+            if 0 <= new_x < width and 0 <= new_y < height:
+                chunk = chunks[(new_y >> bits) * columns + (new_x >> bits)]
+                if chunk is None:
+                    continue
+                cell = chunk[(new_y & mask) << bits | new_x & mask]
+                if cell is None:
+                    continue
+                cell_type = cell.animal_type if isinstance(cell, Animal) else cell
+                if cell_type == target_type:
+                    return new_x, new_y
+        return None
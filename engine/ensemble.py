@@ -0,0 +1,481 @@
+import numpy as np
+
+from config import (
+    GRID_WIDTH, GRID_HEIGHT, INITIAL_PLANTS, INITIAL_HERBIVORES, INITIAL_CARNIVORES, INITIAL_OMNIVORES,
+    ANIMAL_TYPES, VISION_RADIUS, SIMULATION_STEPS, REPRODUCTION_COOLDOWNS
+)
+from engine.genome import (
+    ACTION_CODES, Action, Genome, MUTATION_CHANCE, MUTATION_RATE, MUTATION_CHOICES, RANDOM_CHOICES, KEYS,
+    STRIDES, as_genome, pick
+)
+from engine.grid import DIRECTION_ORDERS
+from engine.ledger import Ledger
+from engine.metrics import StepMetrics
+from engine.rng import BatchedRandom
+from engine.stencils import vision_stencil
+from engine.vision import PLANT_CODE, batch_vision, content_layer, distance_rings
+from engine.world import (
+    ANIMAL_CODES, CARNIVORE, HERBIVORE, OMNIVORE, HUNGER_LIMIT, AGE_LIMIT, VISION_RADII, OWN_KEY_COLUMN,
+    NEIGHBOR_DX, NEIGHBOR_DY
+)
+
+MAX_RADIUS = max(VISION_RADIUS.values())
+COOLDOWN = np.array([0] + [REPRODUCTION_COOLDOWNS[t] for t in ANIMAL_TYPES], dtype=np.int16)
+OWN_KEY = np.array([0] + OWN_KEY_COLUMN[1:], dtype=np.int64)
+# Same-type cells at distance 1 that Grid.get_vision counts (those after the
+# animal's own cell in row-major order), i.e. when STAY and mating are allowed
+MATE_DX, MATE_DY = (np.array(offsets) for offsets in
+                    zip(*[(dx, dy) for distance, dx, dy, before_center in vision_stencil(1)
+                          if distance == 1 and not before_center]))
+DIRECTIONS = np.array(DIRECTION_ORDERS)  # (24, 4, 2), random_move picks one order
+
+# Per action code: the content code it moves to or away from (0 for none)
+# and whether it flees
+TARGET_CODE = np.zeros(len(ACTION_CODES), dtype=np.int8)
+TARGET_CODE[ACTION_CODES[Action.MOVE_TO_PLANT]] = PLANT_CODE
+for _action, _code in ((Action.MOVE_TO_HERBIVORE, HERBIVORE), (Action.FLEE_FROM_HERBIVORE, HERBIVORE),
+                       (Action.MOVE_TO_OMNIVORE, OMNIVORE), (Action.FLEE_FROM_OMNIVORE, OMNIVORE),
+                       (Action.MOVE_TO_CARNIVORE, CARNIVORE), (Action.FLEE_FROM_CARNIVORE, CARNIVORE)):
+    TARGET_CODE[ACTION_CODES[_action]] = _code
+FLEES = np.zeros(len(ACTION_CODES), dtype=bool)
+FLEES[[ACTION_CODES[a] for a in (Action.FLEE_FROM_HERBIVORE, Action.FLEE_FROM_OMNIVORE,
+                                 Action.FLEE_FROM_CARNIVORE)]] = True
+RANDOM_MOVE = ACTION_CODES[Action.RANDOM_MOVE]
+STAY = ACTION_CODES[Action.STAY]
+
+
+def first_true(mask):
+    """Index of the first True in every row of a 2D mask, and whether there is one"""
+    return mask.argmax(axis=1), mask.any(axis=1)
+
+
+def claim(resources, ranks, size):
+    """Which claims win their resource: the one with the lowest rank does"""
+    best = np.full(size, np.iinfo(np.int64).max)
+    np.minimum.at(best, resources, ranks)
+    return best[resources] == ranks
+
+
+class Ensemble:
+    """Many independent worlds stepped together as one set of arrays.
+
+    The maps of all `count` worlds are stacked into (count, height, width)
+    plant and kind layers, and the animals of all worlds share one set of
+    columns with a `world` column. Every phase of a step runs as a few
+    vectorized operations over all animals of all worlds at once:
+    engine.vision.batch_vision for vision (on the layers stacked into one
+    tall map, with empty rows between the worlds), and gathers from the
+    layers for mating, hunting and moving. Genes are kept per species as
+    one (genomes, genes) table of action codes that animals refer to by
+    row, shared like an engine.genome.GenomeTable, next to the Genome of
+    every row for the ledgers.
+
+    The phases follow the rules of Grid.update_animals, but in lockstep:
+    every animal decides on the world as it was at the start of a phase
+    rather than after the animals before it acted, like the 'batched'
+    backend. Where two animals go for the same partner, prey or cell, a
+    random one gets it and the others do nothing this step. Results match
+    run_simulation statistically, not step for step.
+
+    Dead animals are dropped from the columns after every step. Every world
+    has its own engine.ledger.Ledger, which scores its animals like
+    run_simulation does, and the `lifetime` column holds every animal's id in
+    the ledger of its world.
+    """
+
+    COLUMNS = ('world', 'xs', 'ys', 'kind', 'hunger', 'age', 'cooldown', 'stationary', 'genome', 'lifetime')
+
+    def __init__(self, count, initial_genes=None, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.rng = BatchedRandom(seed)
+        self.metrics = StepMetrics(enabled=False)
+        self.ledgers = [Ledger() for _ in range(count)]
+        self.steps = 0  # Steps done so far
+        self.plant_layer = np.zeros((count, height, width), dtype=bool)
+        self.kind_layer = np.zeros((count, height, width), dtype=np.int8)
+        # Action codes of every genome in use, per animal code, and the same
+        # genomes as engine.genome.Genome
+        self.codes = {code: np.zeros((0, len(KEYS[t])), dtype=np.uint8) for t, code in ANIMAL_CODES.items()}
+        self.genomes = {code: [] for code in self.codes}
+        self.genome_count = dict.fromkeys(self.codes, 0)
+        self.populate(initial_genes)
+
+    def populate(self, initial_genes):
+        """Place the plants and animals of create_world in every world"""
+        generator = self.rng.generator
+        cells = self.width * self.height
+        worlds = np.arange(self.count)
+
+        # Plants on random cells, several may land on the same one
+        plants = generator.integers(0, cells, (self.count, INITIAL_PLANTS))
+        self.plant_layer.reshape(self.count, cells)[worlds[:, None], plants] = True
+
+        # Animals on distinct random cells, one permutation per world
+        animal_counts = {'herbivore': INITIAL_HERBIVORES, 'carnivore': INITIAL_CARNIVORES,
+                         'omnivore': INITIAL_OMNIVORES}
+        total = sum(animal_counts.values())
+        if cells < total:
+            raise ValueError(f"A {self.width}x{self.height} map has no room for {total} animals")
+        placed = generator.random((self.count, cells)).argsort(axis=1)[:, :total]
+        kinds = np.concatenate([np.full(n, ANIMAL_CODES[t], dtype=np.int8) for t, n in animal_counts.items()])
+        self.world = np.repeat(worlds, total).astype(np.int32)
+        self.xs = (placed % self.width).ravel().astype(np.int32)
+        self.ys = (placed // self.width).ravel().astype(np.int32)
+        self.kind = np.tile(kinds, self.count)
+        self.hunger = np.zeros(len(self.world), dtype=np.int16)
+        self.age = np.zeros(len(self.world), dtype=np.int16)
+        self.cooldown = np.zeros(len(self.world), dtype=np.int16)
+        self.stationary = np.zeros(len(self.world), dtype=np.int16)
+        self.genome = np.zeros(len(self.world), dtype=np.int32)
+        self.kind_layer[self.world, self.ys, self.xs] = self.kind
+
+        # Genes cycle through the given gene pool like in create_world, or are random
+        for animal_type, code in ANIMAL_CODES.items():
+            rows = np.flatnonzero(self.kind == code)
+            pool = initial_genes.get(animal_type) if initial_genes else None
+            if pool:
+                pool = np.stack([as_genome(animal_type, genes).codes for genes in pool])
+                index = np.arange(animal_counts[animal_type]) % len(pool)
+                self.genome[rows] = self.add_genomes(code, pool)[np.tile(index, self.count)]
+            else:
+                genes = len(KEYS[animal_type])
+                indices = np.tile(np.arange(genes), len(rows))
+                codes = pick(RANDOM_CHOICES[animal_type], indices, generator).reshape(len(rows), genes)
+                self.genome[rows] = self.add_genomes(code, codes)
+        self.lifetime = self.record_births(self.world, self.kind, self.genome)
+
+    def add_genomes(self, code, codes):
+        """Append rows of action codes to the genome table of a species, return their ids"""
+        animal_type = ANIMAL_TYPES[code - 1]
+        self.genomes[code].extend(Genome(animal_type, genes) for genes in codes.copy())
+        table, used = self.codes[code], self.genome_count[code]
+        if used + len(codes) > len(table):
+            grown = np.zeros((max(2 * len(table), used + len(codes)), table.shape[1]), dtype=np.uint8)
+            grown[:used] = table[:used]
+            self.codes[code] = table = grown
+        table[used:used + len(codes)] = codes
+        self.genome_count[code] = used + len(codes)
+        return np.arange(used, used + len(codes), dtype=np.int32)
+
+    def animal_counts(self):
+        """Living animals per world"""
+        return np.bincount(self.world, minlength=self.count)
+
+    def cells(self, rows):
+        """Flat index of the cells of the given animals across all worlds"""
+        return (self.world[rows] * self.height + self.ys[rows]) * self.width + self.xs[rows]
+
+    def index_layer(self):
+        """(count, height, width) layer holding the row of the animal in every cell, or -1"""
+        layer = np.full(self.kind_layer.shape, -1, dtype=np.int64)
+        layer[self.world, self.ys, self.xs] = np.arange(len(self.world))
+        return layer
+
+    def neighbors(self, rows, dx, dy):
+        """Kind codes around the given animals at the offsets dx, dy (one
+        column per offset), -1 outside the map"""
+        xs = self.xs[rows, None] + dx
+        ys = self.ys[rows, None] + dy
+        valid = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        kinds = self.kind_layer[self.world[rows, None], ys.clip(0, self.height - 1), xs.clip(0, self.width - 1)]
+        return np.where(valid, kinds, -1), xs, ys
+
+    def stacked(self, layer):
+        """A layer with the worlds stacked into one tall map, MAX_RADIUS empty
+        rows apart so vision can't reach from one world into the next"""
+        padded = np.zeros((self.count, self.height + MAX_RADIUS, self.width), dtype=layer.dtype)
+        padded[:, :self.height] = layer
+        return padded.reshape(-1, self.width)
+
+    def update_plants(self):
+        """Every plant with a free neighbor spreads to one of them at random,
+        see ArrayGrid.plant_spread"""
+        count, height, width = self.plant_layer.shape
+        free = np.zeros((count, height + 2, width + 2), dtype=bool)
+        free[:, 1:-1, 1:-1] = (self.kind_layer != 0) | ~self.plant_layer
+        free_neighbors = np.stack([free[:, 1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+                                   for dx, dy in zip(NEIGHBOR_DX.tolist(), NEIGHBOR_DY.tolist())])
+        counts = free_neighbors.sum(axis=0)
+        worlds, ys, xs = np.nonzero(self.plant_layer & (counts > 0))
+        if len(xs) == 0:
+            return
+        picks = (self.rng.generator.random(len(xs)) * counts[worlds, ys, xs]).astype(np.int64)
+        seen = free_neighbors[:, worlds, ys, xs].cumsum(axis=0)
+        directions = (seen <= picks).sum(axis=0)
+        self.plant_layer[worlds, ys + NEIGHBOR_DY[directions], xs + NEIGHBOR_DX[directions]] = True
+
+    def record_births(self, worlds, kinds, genomes):
+        """Record new animals in the ledgers of their worlds, return their lifetime ids"""
+        return np.array([self.ledgers[world].birth(ANIMAL_TYPES[code - 1], self.genomes[code][genome])
+                         for world, code, genome in zip(worlds.tolist(), kinds.tolist(), genomes.tolist())],
+                        dtype=np.int32)
+
+    def remove(self, rows, causes):
+        """Take animals off the map and record their deaths of the given
+        causes (one per row, see engine.ledger.CAUSES); their rows are
+        dropped at the end of the step"""
+        for world, lifetime, cause in zip(self.world[rows].tolist(), self.lifetime[rows].tolist(), causes):
+            self.ledgers[world].death(lifetime, cause)
+        self.alive[rows] = False
+        self.kind_layer[self.world[rows], self.ys[rows], self.xs[rows]] = 0
+
+    def age_and_cull(self):
+        """Age everyone, let grazers eat the plant under them and remove the
+        animals that died of hunger or old age, see ArrayGrid.age_and_cull"""
+        self.hunger += 1
+        self.age += 1
+        grazing = (self.kind != CARNIVORE) & self.plant_layer[self.world, self.ys, self.xs]
+        self.plant_layer[self.world[grazing], self.ys[grazing], self.xs[grazing]] = False
+        self.hunger[grazing] = 0
+        starved = self.hunger >= HUNGER_LIMIT[self.kind]
+        dead = np.flatnonzero(starved | (self.age >= AGE_LIMIT[self.kind]))
+        self.remove(dead, ['hunger' if hungry else 'old age' for hungry in starved[dead].tolist()])
+
+    def reproduce(self):
+        """Pairs of fed neighbors of the same type have an offspring on a free
+        neighboring cell, see Grid.update_animals. Returns the number of births."""
+        rows = np.flatnonzero(self.alive)
+        fed = self.hunger[rows] < HUNGER_LIMIT[self.kind[rows]] / 2
+        cooling = fed & (self.cooldown[rows] > 0)
+        self.cooldown[rows[cooling]] -= 1
+        rows = rows[fed & ~cooling]
+
+        # The own type must be seen at distance 1, then the partner is the
+        # first orthogonal neighbor of the same type
+        own = self.kind[rows, None]
+        mates, _, _ = self.neighbors(rows, MATE_DX, MATE_DY)
+        rows = rows[(mates == own).any(axis=1)]
+        around, xs, ys = self.neighbors(rows, NEIGHBOR_DX, NEIGHBOR_DY)
+        side, found = first_true(around == self.kind[rows, None])
+        rows, side, around, xs, ys = rows[found], side[found], around[found], xs[found], ys[found]
+        index = self.index_layer()
+        picked = np.arange(len(rows))
+        partners = index[self.world[rows], ys[picked, side], xs[picked, side]]
+        ready = ((self.cooldown[partners] == 0) &
+                 (self.hunger[partners] < HUNGER_LIMIT[self.kind[partners]] / 2))
+        rows, partners, around, xs, ys = rows[ready], partners[ready], around[ready], xs[ready], ys[ready]
+
+        # The offspring goes to a random free orthogonal neighbor
+        free = around == 0
+        choices = free.sum(axis=1)
+        rows, partners, free, xs, ys, choices = (
+            rows[choices > 0], partners[choices > 0], free[choices > 0], xs[choices > 0], ys[choices > 0],
+            choices[choices > 0])
+        picks = (self.rng.generator.random(len(rows)) * choices).astype(np.int64)
+        side = (free.cumsum(axis=1) <= picks[:, None]).sum(axis=1)
+        picked = np.arange(len(rows))
+        xs, ys = xs[picked, side], ys[picked, side]
+
+        # Every animal mates at most once and every cell gets one offspring
+        ranks = self.rng.generator.permutation(len(rows))
+        animals = np.concatenate([rows, partners])
+        wins = claim(animals, np.concatenate([ranks, ranks]), len(self.alive))
+        cells = (self.world[rows] * self.height + ys) * self.width + xs
+        wins = wins[:len(rows)] & wins[len(rows):] & claim(cells, ranks, self.kind_layer.size)
+        rows, partners, xs, ys = rows[wins], partners[wins], xs[wins], ys[wins]
+
+        kinds = self.kind[rows]
+        self.cooldown[rows] = COOLDOWN[kinds]
+        self.cooldown[partners] = COOLDOWN[kinds]
+        for world, parent1, parent2 in zip(self.world[rows].tolist(), self.lifetime[rows].tolist(),
+                                           self.lifetime[partners].tolist()):
+            self.ledgers[world].mated(parent1, parent2)
+        genomes = np.zeros(len(rows), dtype=np.int32)
+        for code in np.unique(kinds).tolist():
+            pairs = kinds == code
+            genomes[pairs] = self.inherit(code, self.genome[rows[pairs]], self.genome[partners[pairs]])
+        born = {'world': self.world[rows], 'xs': xs.astype(np.int32), 'ys': ys.astype(np.int32), 'kind': kinds,
+                'cooldown': COOLDOWN[kinds], 'genome': genomes,
+                'lifetime': self.record_births(self.world[rows], kinds, genomes)}
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            values = born.get(name, np.zeros(len(rows), dtype=column.dtype))
+            setattr(self, name, np.concatenate([column, values.astype(column.dtype)]))
+        self.alive = np.concatenate([self.alive, np.ones(len(rows), dtype=bool)])
+        self.kind_layer[born['world'], ys, xs] = kinds
+        return len(rows)
+
+    def inherit(self, code, parents1, parents2):
+        """Genome ids of offspring, see engine.genome.mix_genomes: every gene
+        from either parent, and a quarter of them get MUTATION_RATE of their
+        genes redrawn. Offspring of parents with the same genome share it
+        unless they mutate."""
+        generator = self.rng.generator
+        mutants = generator.random(len(parents1)) < MUTATION_CHANCE
+        new = np.flatnonzero((parents1 != parents2) | mutants)
+        table = self.codes[code]
+        first, second = table[parents1[new]], table[parents2[new]]
+        genes = np.where(generator.integers(0, 2, first.shape, dtype=np.uint8) == 0, first, second)
+        mutants = np.flatnonzero(mutants[new])
+        if len(mutants):
+            count = max(1, int(genes.shape[1] * MUTATION_RATE))
+            indices = generator.random((len(mutants), genes.shape[1])).argpartition(count, axis=1)[:, :count]
+            animal_type = ANIMAL_TYPES[code - 1]
+            genes[mutants[:, None], indices] = pick(MUTATION_CHOICES[animal_type], indices.ravel(),
+                                                    generator).reshape(indices.shape)
+        genomes = parents1.copy()
+        genomes[new] = self.add_genomes(code, genes)
+        return genomes
+
+    def hunt(self, code, prey_codes):
+        """Hungry animals of a type eat their first orthogonal neighbor whose
+        code is in prey_codes. Returns the number of hunters and of kills."""
+        rows = np.flatnonzero(self.alive & (self.kind == code) & (self.hunger >= HUNGER_LIMIT[code] / 2))
+        hunters = len(rows)
+        around, xs, ys = self.neighbors(rows, NEIGHBOR_DX, NEIGHBOR_DY)
+        side, found = first_true(np.isin(around, prey_codes))
+        rows, side, xs, ys = rows[found], side[found], xs[found], ys[found]
+        picked = np.arange(len(rows))
+        prey = self.index_layer()[self.world[rows], ys[picked, side], xs[picked, side]]
+        wins = claim(prey, self.rng.generator.permutation(len(rows)), len(self.alive))
+        self.remove(prey[wins], ['eaten'] * int(wins.sum()))
+        self.hunger[rows[wins]] = 0
+        return hunters, int(wins.sum())
+
+    def closest(self, rows, target_codes, content):
+        """Position of the closest cell with the target code within each
+        animal's vision radius, ties broken in row-major order like
+        Grid.find_closest_of_type. Returns xs, ys and whether one was found."""
+        radii = VISION_RADII[self.kind[rows]]
+        px = self.xs[rows] + MAX_RADIUS
+        py = self.world[rows] * (self.height + MAX_RADIUS) + self.ys[rows] + MAX_RADIUS
+        found = np.zeros(len(rows), dtype=bool)
+        xs, ys = self.xs[rows].copy(), self.ys[rows].copy()
+        pending = np.arange(len(rows))
+        for distance, dx, dy, _ in distance_rings(MAX_RADIUS):
+            pending = pending[radii[pending] >= distance]
+            if not len(pending):
+                break
+            cells = content[py[pending, None] + dy, px[pending, None] + dx]
+            hit, any_hit = first_true(cells == target_codes[pending, None])
+            done = pending[any_hit]
+            found[done] = True
+            xs[done] = self.xs[rows[done]] + dx[hit[any_hit]]
+            ys[done] = self.ys[rows[done]] + dy[hit[any_hit]]
+            pending = pending[~any_hit]
+        return xs, ys, found
+
+    def move(self, rows):
+        """Every animal in rows acts on its genes, see Grid.update_animals.
+        Returns the vision lookups, attempted and failed moves."""
+        rows = rows[self.alive[rows]]
+        kinds = self.kind[rows]
+        stacked_plants, stacked_kinds = self.stacked(self.plant_layer), self.stacked(self.kind_layer)
+        stacked_ys = self.world[rows] * (self.height + MAX_RADIUS) + self.ys[rows]
+        keys = batch_vision(stacked_plants, stacked_kinds, self.xs[rows], stacked_ys, kinds, VISION_RADII[kinds])
+
+        actions = np.zeros(len(rows), dtype=np.uint8)
+        for animal_type, code in ANIMAL_CODES.items():
+            of_type = kinds == code
+            genes = keys[of_type].astype(np.int64) @ np.array(STRIDES[animal_type])
+            actions[of_type] = self.codes[code][self.genome[rows[of_type]], genes]
+        actions[self.stationary[rows] >= 3] = RANDOM_MOVE
+        sees_own = keys[np.arange(len(rows)), OWN_KEY[kinds]] == 1
+        actions[(actions == STAY) & ~sees_own] = RANDOM_MOVE
+
+        # Toward or away from the closest target, along the larger difference
+        xs, ys = self.xs[rows].copy(), self.ys[rows].copy()
+        targeted = np.flatnonzero(TARGET_CODE[actions] != 0)
+        content = content_layer(stacked_plants, stacked_kinds, MAX_RADIUS)
+        target_xs, target_ys, found = self.closest(rows[targeted], TARGET_CODE[actions[targeted]], content)
+        targeted, target_xs, target_ys = targeted[found], target_xs[found], target_ys[found]
+        dx, dy = target_xs - xs[targeted], target_ys - ys[targeted]
+        sign = np.where(FLEES[actions[targeted]], -1, 1)
+        horizontal = np.abs(dx) > np.abs(dy)
+        step_x = np.where(horizontal, np.where(dx > 0, 1, -1) * sign, 0)
+        step_y = np.where(horizontal, 0, np.where(dy > 0, 1, -1) * sign)
+        new_xs, new_ys = xs[targeted] + step_x, ys[targeted] + step_y
+        valid = (new_xs >= 0) & (new_xs < self.width) & (new_ys >= 0) & (new_ys < self.height)
+        xs[targeted[valid]], ys[targeted[valid]] = new_xs[valid], new_ys[valid]
+
+        # A random order of the four neighbors, then the first free one
+        wandering = np.flatnonzero(actions == RANDOM_MOVE)
+        orders = DIRECTIONS[self.rng.generator.integers(len(DIRECTIONS), size=len(wandering))]
+        around, around_xs, around_ys = self.neighbors(rows[wandering], orders[:, :, 0], orders[:, :, 1])
+        side, any_free = first_true(around == 0)
+        picked = np.arange(len(wandering))
+        xs[wandering[any_free]] = around_xs[picked, side][any_free]
+        ys[wandering[any_free]] = around_ys[picked, side][any_free]
+
+        # Moves go to cells that were free when the phase began, one animal each
+        attempted = (xs != self.xs[rows]) | (ys != self.ys[rows])
+        moving = np.flatnonzero(attempted)
+        world = self.world[rows[moving]]
+        free = self.kind_layer[world, ys[moving], xs[moving]] == 0
+        moving = moving[free]
+        cells = (self.world[rows[moving]] * self.height + ys[moving]) * self.width + xs[moving]
+        moving = moving[claim(cells, self.rng.generator.permutation(len(moving)), self.kind_layer.size)]
+
+        movers = rows[moving]
+        self.kind_layer[self.world[movers], self.ys[movers], self.xs[movers]] = 0
+        self.xs[movers], self.ys[movers] = xs[moving], ys[moving]
+        self.kind_layer[self.world[movers], self.ys[movers], self.xs[movers]] = self.kind[movers]
+        grazing = movers[(self.kind[movers] != CARNIVORE) &
+                         self.plant_layer[self.world[movers], self.ys[movers], self.xs[movers]]]
+        self.plant_layer[self.world[grazing], self.ys[grazing], self.xs[grazing]] = False
+        self.hunger[grazing] = 0
+        self.stationary[rows] += 1
+        self.stationary[movers] = 0
+        return len(rows), int(attempted.sum()), int(attempted.sum()) - len(movers)
+
+    def step(self):
+        """Advance every world by one step"""
+        metrics = self.metrics
+        metrics.start_step()
+        for ledger in self.ledgers:
+            ledger.step = self.steps
+        self.update_plants()
+        self.alive = np.ones(len(self.world), dtype=bool)
+        self.age_and_cull()
+        # Like Grid, only the animals alive at the start of the step move
+        movers = np.flatnonzero(self.alive)
+        metrics.end_phase('aging')
+        births = self.reproduce()
+        metrics.end_phase('reproduction')
+        hunts, kills = self.hunt(OMNIVORE, [HERBIVORE])
+        metrics.end_phase('omnivore_predation')
+        carnivore_hunts, carnivore_kills = self.hunt(CARNIVORE, [HERBIVORE, OMNIVORE])
+        hunts += carnivore_hunts
+        kills += carnivore_kills
+        metrics.end_phase('carnivore_predation')
+        vision_calls, moves_attempted, moves_failed = self.move(movers)
+        metrics.end_phase('movement')
+
+        for name in self.COLUMNS:
+            setattr(self, name, getattr(self, name)[self.alive])
+        self.compact_genomes()
+        self.steps += 1
+        metrics.end_step(vision_calls=vision_calls, hunts=hunts, moves_attempted=moves_attempted,
+                         moves_failed=moves_failed, births=births, kills=kills)
+
+    def compact_genomes(self):
+        """Drop the genomes of dead animals once they are most of a table"""
+        for code in self.codes:
+            of_type = self.kind == code
+            if self.genome_count[code] < 2 * of_type.sum() + 1024:
+                continue
+            used, self.genome[of_type] = np.unique(self.genome[of_type], return_inverse=True)
+            self.codes[code] = self.codes[code][used]
+            self.genomes[code] = [self.genomes[code][genome] for genome in used.tolist()]
+            self.genome_count[code] = len(used)
+
+    def results(self):
+        """Per world, (engine.ledger.Lifetime, survival_time) of every animal
+        that lived in it, in order of birth, like run_simulation returns"""
+        return [ledger.results(self.steps) for ledger in self.ledgers]
+
+
+def run_ensemble(count, initial_genes=None, seed=None, steps=SIMULATION_STEPS, metrics=None,
+                 width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Run `count` independent width by height simulations in lockstep and
+    return the results of each, in the shape run_simulation returns them"""
+    ensemble = Ensemble(count, initial_genes, width, height, seed=seed)
+    if metrics is not None:
+        ensemble.metrics = metrics
+    for _ in range(steps):
+        if not len(ensemble.world):
+            break
+        ensemble.step()
+    return ensemble.results()
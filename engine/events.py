@@ -0,0 +1,217 @@
+import csv
+import sys
+import queue
+import struct
+import threading
+from collections import namedtuple
+
+# Levels, lowest is most verbose
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING}
+
+# Every category is logged at a fixed level
+CATEGORIES = {
+    'birth': INFO,
+    'death': INFO,
+    'predation': INFO,
+    'feeding': INFO,
+    'movement': DEBUG,  # One event per animal per step
+}
+
+# other_x/other_y hold the second cell of an event: the parent for a birth,
+# the prey for predation and the destination for movement, -1 if unused.
+Event = namedtuple('Event', ['simulation', 'step', 'category', 'animal_type',
+                             'x', 'y', 'other_x', 'other_y', 'detail'])
+
+
+class EventLog:
+    """Structured simulation events with per-category switches.
+
+    The engine checks the category flag before building an event, e.g.
+
+        if self.events.birth:
+            self.events.emit('birth', animal_type, x, y, parent_x, parent_y)
+
+    so a disabled category costs one attribute lookup. A category is enabled
+    when there is a sink, its level is at least the log level and it is in
+    `categories` (all of them by default).
+
+    Events are buffered and handed to the sink in batches on a background
+    thread, so writing them never blocks the simulation. Call close() to
+    flush everything.
+    """
+
+    def __init__(self, sink=None, level=INFO, categories=None, batch_size=1024):
+        self.sink = sink
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        self.categories = set(CATEGORIES if categories is None else categories)
+        unknown = self.categories - set(CATEGORIES)
+        if unknown:
+            raise ValueError(f"Unknown event categories: {', '.join(sorted(unknown))}")
+        for category, category_level in CATEGORIES.items():
+            enabled = sink is not None and category_level >= self.level and category in self.categories
+            setattr(self, category, enabled)
+
+        self.simulation = 0
+        self.step = 0
+        self.batch_size = batch_size
+        self.buffer = []
+        self.queue = None
+        self.writer = None
+        if sink is not None:
+            self.queue = queue.Queue()
+            self.writer = threading.Thread(target=self._write_batches, daemon=True)
+            self.writer.start()
+
+    def emit(self, category, animal_type, x, y, other_x=-1, other_y=-1, detail=''):
+        self.buffer.append(Event(self.simulation, self.step, category, animal_type,
+                                 int(x), int(y), int(other_x), int(other_y), detail))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered events to the writer thread"""
+        if self.buffer and self.queue is not None:
+            self.queue.put(self.buffer)
+        self.buffer = []
+
+    def _write_batches(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            self.sink.write(batch)
+
+    def close(self):
+        """Write all pending events and close the sink"""
+        if self.writer is None:
+            return
+        self.flush()
+        self.queue.put(None)
+        self.writer.join()
+        self.writer = None
+        self.sink.close()
+
+
+def describe(event):
+    """One human readable line for an event"""
+    where = f"({event.x}, {event.y})"
+    other = f"({event.other_x}, {event.other_y})"
+    if event.category == 'birth':
+        return f"New {event.animal_type} born at {where} with mixed genes"
+    if event.category == 'death':
+        return f"{event.animal_type.upper()} DEATH at {where}: Died from {event.detail}"
+    if event.category == 'predation':
+        return f"Hungry {event.animal_type} at {where} ate a {event.detail} at {other}"
+    if event.category == 'feeding':
+        return f"{event.animal_type} ate a plant at {where}"
+    return f"{event.animal_type} at {where} chose {event.detail} and moved to {other}"
+
+
+class TextSink:
+    """Write events as readable lines, by default to stdout"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, events):
+        self.stream.write(''.join(describe(event) + '\n' for event in events))
+
+    def close(self):
+        self.stream.flush()
+
+
+class CSVSink:
+    """Write events as CSV rows with a header line"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(Event._fields)
+
+    def write(self, events):
+        self.writer.writerows(events)
+
+    def close(self):
+        self.file.close()
+
+
+# Binary record layout: simulation, step, category, animal type, x, y,
+# other_x, other_y, detail. Strings are stored as ids into the string table,
+# which is written inline: a DEFINE record introduces the next id.
+BINARY_MAGIC = b'EVLOG1\n'
+RECORD = struct.Struct('<IIBBhhhhH')
+DEFINE = struct.Struct('<H')
+RECORD_TAG = b'E'
+DEFINE_TAG = b'S'
+
+
+class BinarySink:
+    """Write events as fixed size binary records, see read_binary_events"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(BINARY_MAGIC)
+        self.ids = {}
+
+    def _id(self, text, chunks):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.ids)
+            data = text.encode()
+            chunks.append(DEFINE_TAG + DEFINE.pack(len(data)) + data)
+        return string_id
+
+    def write(self, events):
+        chunks = []
+        for event in events:
+            chunks.append(RECORD_TAG + RECORD.pack(
+                event.simulation, event.step,
+                self._id(event.category, chunks), self._id(event.animal_type, chunks),
+                event.x, event.y, event.other_x, event.other_y,
+                self._id(event.detail, chunks)))
+        self.file.write(b''.join(chunks))
+
+    def close(self):
+        self.file.close()
+
+
+def read_binary_events(path):
+    """Read the events written by a BinarySink"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError(f"{path} is not a binary event log")
+    strings = []
+    events = []
+    offset = len(BINARY_MAGIC)
+    while offset < len(data):
+        tag = data[offset:offset + 1]
+        offset += 1
+        if tag == DEFINE_TAG:
+            (length,) = DEFINE.unpack_from(data, offset)
+            offset += DEFINE.size
+            strings.append(data[offset:offset + length].decode())
+            offset += length
+        elif tag == RECORD_TAG:
+            simulation, step, category, animal_type, x, y, other_x, other_y, detail = \
+                RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            events.append(Event(simulation, step, strings[category], strings[animal_type],
+                                x, y, other_x, other_y, strings[detail]))
+        else:
+            raise ValueError(f"Corrupt binary event log {path} at byte {offset - 1}")
+    return events
+
+
+def open_sink(path):
+    """Pick a sink from the file name: .csv, .bin or '-' for stdout"""
+    if path == '-':
+        return TextSink()
+    if path.endswith('.csv'):
+        return CSVSink(path)
+    if path.endswith('.bin'):
+        return BinarySink(path)
+    raise ValueError(f"Unknown event log format: {path} (use .csv, .bin or -)")
@@ -0,0 +1,104 @@
+import os
+import re
+import sys
+import json
+from collections import defaultdict
+
+import numpy as np
+
+from config import VISION_RADIUS
+from engine.genome import ACTIONS, ACTION_CODES, Action, Genome, KEYS, as_genome
+
+FORMAT_VERSION = 1
+JSON_NAME = re.compile(r'best_genes_(?P<animal_type>[a-z]+)_(?P<count>\d+)\.json$')
+
+
+def save_gene_bank(path, pools):
+    """Write a dict of animal_type -> list of genomes (or gene dicts)
+
+    A gene bank is an uncompressed .npz archive holding every pool as an
+    (N, genes) uint8 matrix, so loading thousands of genomes is one read
+    with no per-gene parsing. It also records the format version, the vision
+    radius of every species and the action names in code order, so a bank
+    stays loadable if the Action enum is reordered.
+    """
+    arrays = {
+        'format_version': np.array(FORMAT_VERSION),
+        'actions': np.array([action.name for action in ACTIONS]),
+        'species': np.array(sorted(pools)),
+    }
+    for animal_type, genomes in pools.items():
+        codes = [as_genome(animal_type, genes).codes for genes in genomes]
+        arrays[f'{animal_type}_vision_radius'] = np.array(VISION_RADIUS[animal_type])
+        arrays[f'{animal_type}_genomes'] = (np.stack(codes) if codes else
+                                            np.zeros((0, len(KEYS[animal_type])), dtype=np.uint8))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def load_gene_bank(path):
+    """Read a gene bank back as a dict of animal_type -> list of Genome"""
+    with np.load(path) as bank:
+        version = int(bank['format_version'])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has gene bank format {version}, expected {FORMAT_VERSION}")
+        # Map the stored action codes onto the current ones
+        remap = np.array([ACTION_CODES[Action[name]] for name in bank['actions'].tolist()], dtype=np.uint8)
+
+        pools = {}
+        for animal_type in bank['species'].tolist():
+            radius = int(bank[f'{animal_type}_vision_radius'])
+            if radius != VISION_RADIUS.get(animal_type):
+                raise ValueError(f"{path} holds {animal_type} genes for vision radius {radius}, "
+                                 f"but config.VISION_RADIUS is {VISION_RADIUS.get(animal_type)}")
+            codes = bank[f'{animal_type}_genomes']
+            if not np.array_equal(remap, np.arange(len(remap))):
+                codes = remap[codes]
+            pools[animal_type] = [Genome(animal_type, row) for row in codes]
+    return pools
+
+
+def load_json_genes(path, animal_type):
+    """Read a JSON gene pool written by older versions as a list of Genome"""
+    with open(path, 'r') as f:
+        serialized_genes = json.load(f)
+
+    genomes = []
+    for serialized_gene in serialized_genes:
+        genome = Genome.from_dict(animal_type, {})
+        for key_str, action_str in serialized_gene.items():
+            genome[tuple(map(int, key_str.strip('()').split(', ')))] = Action[action_str]
+        genomes.append(genome)
+    return genomes
+
+
+def convert_results(results_dir='simulation_results', remove=False):
+    """Convert the JSON gene pools written by older versions to gene banks
+
+    Every best_genes_<type>_<n>.json below results_dir ends up in one
+    best_genes_<n>.npz per directory and n. Returns the written paths. From
+    the command line: python -m engine.gene_bank simulation_results
+    """
+    groups = defaultdict(dict)
+    for directory, _, files in os.walk(results_dir):
+        for name in files:
+            match = JSON_NAME.match(name)
+            if match:
+                key = (directory, match['count'])
+                groups[key][match['animal_type']] = os.path.join(directory, name)
+
+    written = []
+    for (directory, count), paths in sorted(groups.items()):
+        pools = {animal_type: load_json_genes(path, animal_type) for animal_type, path in paths.items()}
+        bank_path = os.path.join(directory, f'best_genes_{count}.npz')
+        save_gene_bank(bank_path, pools)
+        written.append(bank_path)
+        if remove:
+            for path in paths.values():
+                os.remove(path)
+    return written
+
+
+if __name__ == '__main__':
+    for bank_path in convert_results(sys.argv[1] if len(sys.argv) > 1 else 'simulation_results'):
+        print(f"Wrote {bank_path}")
@@ -0,0 +1,290 @@
+import random
+import itertools
+from enum import Enum
+
+import numpy as np
+
+from config import ANIMAL_TYPES, VISION_RADIUS
+
+
+class Action(Enum):
+    MOVE_TO_PLANT = "move_to_plant"
+    MOVE_TO_HERBIVORE = "move_to_herbivore"
+    MOVE_TO_OMNIVORE = "move_to_omnivore"
+    MOVE_TO_CARNIVORE = "move_to_carnivore"
+    FLEE_FROM_HERBIVORE = "flee_from_herbivore"
+    FLEE_FROM_OMNIVORE = "flee_from_omnivore"
+    FLEE_FROM_CARNIVORE = "flee_from_carnivore"
+    RANDOM_MOVE = "random_move"
+    STAY = "stay"
+
+
+# A genome stores every action as its index in ACTIONS
+ACTIONS = tuple(Action)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+# Position of the animal's own type in a vision key (p, h, o, c)
+OWN_KEY_DIGIT = {'herbivore': 1, 'omnivore': 2, 'carnivore': 3}
+
+MUTATION_CHANCE = 0.25
+MUTATION_RATE = 0.1
+
+
+def possible_actions(animal_type, key):
+    """Actions that make sense for a vision key (p, h, o, c)"""
+    p, h, o, c = key
+    # Create list of possible actions based on what's visible
+    actions = []
+
+    # Add movement actions only if target is visible
+    if p > 0:  # Plant is visible
+        actions.append(Action.MOVE_TO_PLANT)
+    if h > 0:  # Herbivore is visible
+        actions.append(Action.MOVE_TO_HERBIVORE)
+        actions.append(Action.FLEE_FROM_HERBIVORE)
+    if o > 0:  # Omnivore is visible
+        actions.append(Action.MOVE_TO_OMNIVORE)
+        actions.append(Action.FLEE_FROM_OMNIVORE)
+    if c > 0:  # Carnivore is visible
+        actions.append(Action.MOVE_TO_CARNIVORE)
+        actions.append(Action.FLEE_FROM_CARNIVORE)
+
+    actions.append(Action.RANDOM_MOVE)
+
+    if (animal_type == 'herbivore' and h == 1) or \
+       (animal_type == 'omnivore' and o == 1) or \
+       (animal_type == 'carnivore' and c == 1):
+        actions.append(Action.STAY)
+    return actions
+
+
+def mutation_actions(animal_type, key):
+    """Actions an offspring's mutated gene can take: anything, but STAY only
+    when the same type is at distance 1"""
+    actions = list(Action)
+    if key[OWN_KEY_DIGIT[animal_type]] != 1:
+        actions.remove(Action.STAY)
+    return actions
+
+
+def key_strides(radius):
+    """Place values of the mixed-radix gene index, one digit per key column
+    running from 0 to the vision radius"""
+    base = radius + 1
+    return base ** 3, base ** 2, base, 1
+
+
+def gene_keys(radius):
+    """All vision keys in gene index order"""
+    return list(itertools.product(range(radius + 1), repeat=4))
+
+
+def choice_table(animal_type, actions_for):
+    """Precompute the allowed action codes for every gene of a type.
+
+    Returns (choices, counts): row i of choices holds the codes allowed for
+    gene i, padded to a common width, and counts[i] how many are valid, so a
+    uniform pick for many genes at once is choices[i, floor(u * counts[i])].
+    """
+    keys = gene_keys(VISION_RADIUS[animal_type])
+    choices = np.zeros((len(keys), len(ACTIONS)), dtype=np.uint8)
+    counts = np.zeros(len(keys), dtype=np.int64)
+    for index, key in enumerate(keys):
+        codes = [ACTION_CODES[action] for action in actions_for(animal_type, key)]
+        choices[index, :len(codes)] = codes
+        counts[index] = len(codes)
+    return choices, counts
+
+
+STRIDES = {animal_type: key_strides(VISION_RADIUS[animal_type]) for animal_type in ANIMAL_TYPES}
+KEYS = {animal_type: gene_keys(VISION_RADIUS[animal_type]) for animal_type in ANIMAL_TYPES}
+RANDOM_CHOICES = {animal_type: choice_table(animal_type, possible_actions) for animal_type in ANIMAL_TYPES}
+MUTATION_CHOICES = {animal_type: choice_table(animal_type, mutation_actions) for animal_type in ANIMAL_TYPES}
+
+
+def gene_index(animal_type, key):
+    """Index of the gene for a vision key"""
+    s0, s1, s2, s3 = STRIDES[animal_type]
+    p, h, o, c = key
+    return p * s0 + h * s1 + o * s2 + c * s3
+
+
+def numpy_rng():
+    """A NumPy generator seeded from the random module, so vectorized draws
+    stay reproducible under random.seed"""
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def pick(table, indices, rng):
+    """Uniformly pick an allowed action code for each gene index"""
+    choices, counts = table
+    slots = (rng.random(len(indices)) * counts[indices]).astype(np.int64)
+    return choices[indices, slots]
+
+
+class Genome:
+    """The genes of one animal as a flat uint8 array of action codes.
+
+    Gene i holds the action for the vision key whose mixed-radix digits spell
+    i (see key_strides), which takes a few KB instead of a dict of tuples and
+    Action members. Indexing with a key tuple and the usual dict methods keep
+    working, so code that treats genes as a dict of key -> Action is unchanged.
+    """
+
+    __slots__ = ('animal_type', 'codes')
+
+    def __init__(self, animal_type, codes):
+        self.animal_type = animal_type
+        self.codes = codes
+
+    def __reduce__(self):
+        # Much faster to pickle than the generic __slots__ path
+        return Genome, (self.animal_type, self.codes)
+
+    @classmethod
+    def from_dict(cls, animal_type, genes):
+        """Encode a dict of key -> Action"""
+        codes = np.zeros(len(KEYS[animal_type]), dtype=np.uint8)
+        for key, action in genes.items():
+            codes[gene_index(animal_type, key)] = ACTION_CODES[action]
+        return cls(animal_type, codes)
+
+    def __getitem__(self, key):
+        return ACTIONS[self.codes[gene_index(self.animal_type, key)]]
+
+    def __setitem__(self, key, action):
+        self.codes[gene_index(self.animal_type, key)] = ACTION_CODES[action]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return iter(KEYS[self.animal_type])
+
+    def __contains__(self, key):
+        radius = VISION_RADIUS[self.animal_type]
+        return isinstance(key, tuple) and len(key) == 4 and all(0 <= digit <= radius for digit in key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Genome):
+            return NotImplemented
+        return self.animal_type == other.animal_type and np.array_equal(self.codes, other.codes)
+
+    def keys(self):
+        return list(KEYS[self.animal_type])
+
+    def values(self):
+        return [ACTIONS[code] for code in self.codes.tolist()]
+
+    def items(self):
+        return list(zip(KEYS[self.animal_type], self.values()))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def copy(self):
+        return Genome(self.animal_type, self.codes.copy())
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def as_genome(animal_type, genes):
+    """Accept a Genome or a dict of key -> Action"""
+    if isinstance(genes, Genome):
+        return genes
+    return Genome.from_dict(animal_type, genes)
+
+
+def random_genome(animal_type, rng=None):
+    """Random genes for all possible vision configurations"""
+    rng = rng or numpy_rng()
+    indices = np.arange(len(KEYS[animal_type]))
+    return Genome(animal_type, pick(RANDOM_CHOICES[animal_type], indices, rng))
+
+
+def mutate(genome, table, rng=None, rate=MUTATION_RATE):
+    """Give a random `rate` share of the genes a new action from table, in place"""
+    rng = rng or numpy_rng()
+    count = max(1, int(len(genome.codes) * rate))
+    indices = rng.choice(len(genome.codes), count, replace=False)
+    genome.codes[indices] = pick(table, indices, rng)
+    return genome
+
+
+def mutated(genome, table, rng=None, rate=MUTATION_RATE):
+    """Like mutate, but copy-on-write: the genome is left alone and a changed
+    copy returned, or the genome itself if every drawn action was the one it
+    already had"""
+    rng = rng or numpy_rng()
+    count = max(1, int(len(genome.codes) * rate))
+    indices = rng.choice(len(genome.codes), count, replace=False)
+    codes = pick(table, indices, rng)
+    if np.array_equal(codes, genome.codes[indices]):
+        return genome
+    genome = genome.copy()
+    genome.codes[indices] = codes
+    return genome
+
+
+def crossover(parent1, parent2, rng=None):
+    """Inherit every gene from either parent with a 50% chance"""
+    rng = rng or numpy_rng()
+    mask = rng.random(len(parent1.codes)) < 0.5
+    return Genome(parent1.animal_type, np.where(mask, parent1.codes, parent2.codes))
+
+
+def mix_genomes(animal_type, parent1, parent2, rng=None):
+    """Mix genes from two parents with mutation chance
+
+    Parents with the same genes pass on their genome itself rather than a
+    copy, and a mutation copies it only when it changes a gene, so the
+    offspring of a shared genome share it too.
+    """
+    rng = rng or numpy_rng()
+    parent1, parent2 = as_genome(animal_type, parent1), as_genome(animal_type, parent2)
+    if parent1 is parent2 or np.array_equal(parent1.codes, parent2.codes):
+        genome = parent1
+    else:
+        genome = crossover(parent1, parent2, rng)
+    # 25% chance to mutate 10% of the genes
+    if rng.random() < MUTATION_CHANCE:
+        genome = mutated(genome, MUTATION_CHOICES[animal_type], rng)
+    return genome
+
+
+class GenomeTable:
+    """Genomes stored once and referred to by id.
+
+    intern() hands out one id per distinct Genome object, so animals started
+    from the same gene set, or born to parents that shared one, keep a
+    single entry between them. Genomes are shared, so they must not be
+    changed in place once interned, see mutated.
+    """
+
+    def __init__(self, genomes=()):
+        self.genomes = []
+        self.ids = {}  # id() of an interned Genome -> genome id
+        for genome in genomes:
+            self.intern(genome)
+
+    def __getstate__(self):
+        # Object ids don't survive pickling, they are rebuilt on load
+        return self.genomes
+
+    def __setstate__(self, genomes):
+        self.__init__(genomes)
+
+    def __getitem__(self, genome_id):
+        return self.genomes[genome_id]
+
+    def __len__(self):
+        return len(self.genomes)
+
+    def intern(self, genome):
+        """The id of genome, adding it if it is new"""
+        genome_id = self.ids.get(id(genome))
+        if genome_id is None:
+            genome_id = self.ids[id(genome)] = len(self.genomes)
+            self.genomes.append(genome)
+        return genome_id
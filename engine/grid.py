@@ -0,0 +1,645 @@
+import math
+import itertools
+
+from config import PLANT_TYPE, VISION_RADIUS, HUNGER_DEATH, AGE_DEATH, REPRODUCTION_COOLDOWNS
+from engine.animal import Action, Animal, generate_random_genes, mix_genes
+from engine.events import EventLog
+from engine.ledger import Ledger
+from engine.metrics import StepMetrics
+from engine.rng import BatchedRandom
+from engine.spatial_index import SpatialIndex
+from engine.stencils import vision_stencil
+from engine.vision_cache import VisionCache
+
+# Every order of the four neighbors, random_move picks one with a single draw
+DIRECTION_ORDERS = list(itertools.permutations([(0, 1), (1, 0), (0, -1), (-1, 0)]))
+
+
+class Grid:
+    def __init__(self, width, height, vision_cache=False, events=None, seed=None):
+        self.width = width
+        self.height = height
+        self.grid = self.new_cells()
+        self.plants = set()  # Store plant coordinates
+        self.omnivores = set()
+        self.carnivores = set()
+        self.herbivores = set()
+        # Reuses get_vision results until a cell within vision range changes.
+        # Off by default: animals move every step, so few entries survive
+        # long enough to pay for their invalidation.
+        self.vision_cache = VisionCache(VISION_RADIUS) if vision_cache else None
+        # Positions of visible plants and animals by type, for find_closest_of_type
+        self.index = SpatialIndex()
+        # Births, deaths, meals and moves are reported here, see engine.events
+        self.events = events if events is not None else EventLog()
+        # Phase timings and counters of update_animals, see engine.metrics
+        self.metrics = StepMetrics(enabled=False)
+        # Birth, death and offspring of every animal, see engine.ledger
+        self.ledger = Ledger()
+        # All randomness of the simulation comes from here, see engine.rng
+        self.rng = BatchedRandom(seed)
+        # Plants that can still spread, i.e. have a neighbor without a visible
+        # plant, and the cells whose neighborhood changed since it was updated
+        self.plant_frontier = set()
+        self.frontier_dirty = set()
+
+    def __getstate__(self):
+        """Snapshots leave out the event log, the metrics and the lookup
+        structures derived from the grid, they are rebuilt on restore"""
+        state = self.__dict__.copy()
+        state['events'] = None
+        state['metrics'] = None
+        state['vision_cache'] = self.vision_cache is not None
+        state['index'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.events = EventLog()
+        self.metrics = StepMetrics(enabled=False)
+        self.vision_cache = VisionCache(VISION_RADIUS) if state['vision_cache'] else None
+        self.index = SpatialIndex()
+        # Only cells holding a plant or an animal show up in the index
+        for x, y in self.plants | self.herbivores | self.carnivores | self.omnivores:
+            self.index.set(x, y, self.cell_type(x, y))
+
+    def new_cells(self):
+        """Storage for the cells, grid[y][x] holds None, PLANT_TYPE or an Animal"""
+        return [[None for _ in range(self.width)] for _ in range(self.height)]
+
+    def cell_changed(self, x, y):
+        """Must be called whenever the content of grid[y][x] changes"""
+        if self.vision_cache is not None:
+            self.vision_cache.invalidate(x, y)
+        self.index.set(x, y, self.cell_type(x, y))
+        self.frontier_dirty.add((x, y))
+
+    def plant_changed(self, x, y):
+        """Must be called when (x, y) is added to or removed from plants
+        without the content of the cell changing"""
+        self.frontier_dirty.add((x, y))
+
+    def cell_type(self, x, y):
+        """Return PLANT_TYPE, an animal type or None for what is visible in a cell"""
+        cell = self.grid[y][x]
+        if isinstance(cell, Animal):
+            return cell.animal_type
+        return cell
+
+    def is_valid_position(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_empty(self, x, y):
+        """Check if position is valid and has no animals (plants are ok)"""
+        if not self.is_valid_position(x, y):
+            return False
+        cell = self.grid[y][x]
+        return cell is None or cell == PLANT_TYPE
+
+    def is_empty_for_plant(self, x, y):
+        """Check if position is valid and has no plant (animals are ok)"""
+        if not self.is_valid_position(x, y):
+            return False
+        return self.grid[y][x] == None or isinstance(self.grid[y][x], Animal)
+
+    def has_animal(self, x, y):
+        """Check if position has an animal"""
+        if not self.is_valid_position(x, y):
+            return False
+        return isinstance(self.grid[y][x], Animal)
+
+    def animal_at(self, x, y):
+        """Return the animal at a position, or None"""
+        cell = self.grid[y][x]
+        return cell if isinstance(cell, Animal) else None
+
+    def animal_count(self):
+        return len(self.herbivores) + len(self.carnivores) + len(self.omnivores)
+
+    def add_plant(self, x, y):
+        if self.is_empty_for_plant(x, y):
+            # If there's an animal, keep it in the same cell
+            existing_animal = self.grid[y][x] if isinstance(self.grid[y][x], Animal) else None
+            self.grid[y][x] = PLANT_TYPE
+            self.plants.add((x, y))
+            # Put the animal back on top if there was one
+            if existing_animal:
+                self.grid[y][x] = existing_animal
+                self.plant_changed(x, y)
+            else:
+                self.cell_changed(x, y)
+            return True
+        return False
+
+    def add_animal(self, x, y, animal_type, is_offspring=False, genes=None):
+        if self.is_empty(x, y):
+            genes = genes or generate_random_genes(animal_type, self.rng.generator)
+            animal = Animal(x, y, animal_type, is_offspring, genes)
+            animal.lifetime = self.ledger.birth(animal_type, animal.genes)
+            self.grid[y][x] = animal
+            if animal_type == 'omnivore':
+                self.omnivores.add((x, y))
+            elif animal_type == 'carnivore':
+                self.carnivores.add((x, y))
+            elif animal_type == 'herbivore':
+                self.herbivores.add((x, y))
+            self.cell_changed(x, y)
+            return True
+        return False
+
+    def get_empty_neighbors(self, x, y):
+        neighbors = []
+        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            new_x, new_y = x + dx, y + dy
+            if self.is_empty_for_plant(new_x, new_y):  # Changed from is_empty to is_empty_for_plant
+                neighbors.append((new_x, new_y))
+        return neighbors
+
+    def update_plant_frontier(self):
+        """Re-check the plants around every cell that changed since the last call"""
+        for x, y in self.frontier_dirty:
+            for cell_x, cell_y in ((x, y), (x, y + 1), (x + 1, y), (x, y - 1), (x - 1, y)):
+                if (cell_x, cell_y) in self.plants and self.get_empty_neighbors(cell_x, cell_y):
+                    self.plant_frontier.add((cell_x, cell_y))
+                else:
+                    self.plant_frontier.discard((cell_x, cell_y))
+        self.frontier_dirty.clear()
+
+    def update_plants(self):
+        """Every plant with a free neighbor spreads to one of them at random
+
+        Only the frontier is visited, plants surrounded by plants can't spread.
+        """
+        self.update_plant_frontier()
+        new_plants = set()
+        # Sorted, so the order does not depend on the set's history (see update_animals)
+        plants = sorted(self.plant_frontier)
+        for (plant_x, plant_y), draw in zip(plants, self.rng.floats(len(plants))):
+            empty_neighbors = self.get_empty_neighbors(plant_x, plant_y)
+            new_x, new_y = empty_neighbors[int(draw * len(empty_neighbors))]
+            new_plants.add((new_x, new_y))
+        
+        # Add all new plants
+        for x, y in new_plants:
+            self.add_plant(x, y)
+
+    def calculate_distance(self, x1, y1, x2, y2):
+        return round(math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2))
+
+    def get_vision(self, x, y, animal_type):
+        """Return closest distances to each type within vision radius
+
+        The returned dict may be shared with the vision cache, don't modify it.
+        """
+        if self.vision_cache is None:
+            return self.scan_vision(x, y, animal_type)
+        vision = self.vision_cache.get(x, y, animal_type)
+        if vision is None:
+            vision = self.scan_vision(x, y, animal_type)
+            self.vision_cache.put(x, y, animal_type, vision)
+        return vision
+
+    def scan_vision(self, x, y, animal_type):
+        """Walk the distance-ordered vision stencil until every type is found"""
+        vision = {'plant': 0, 'herbivore': 0, 'omnivore': 0, 'carnivore': 0}
+        missing = len(vision)
+        grid = self.grid
+        width, height = self.width, self.height
+        
+        for distance, dx, dy, before_center in vision_stencil(VISION_RADIUS[animal_type]):
+            new_x, new_y = x + dx, y + dy
+            if not (0 <= new_x < width and 0 <= new_y < height):
+                continue
+            
+            cell = grid[new_y][new_x]
+            if cell is None:
+                continue
+            cell_type = cell.animal_type if isinstance(cell, Animal) else cell
+            
+            # The first hit of a type is its closest one. Same-type animals
+            # scanned before the animal's own cell are ignored, as the
+            # original row-major scan reset its own-type distance there.
+            if vision[cell_type] == 0 and not (before_center and cell_type == animal_type):
+                vision[cell_type] = distance
+                missing -= 1
+                if not missing:
+                    break
+        
+        return vision
+
+    def move_towards(self, x, y, target_x, target_y):
+        """Move one step towards target"""
+        dx = target_x - x
+        dy = target_y - y
+        
+        # Move in direction of larger difference
+        if abs(dx) > abs(dy):
+            dx = 1 if dx > 0 else -1
+            dy = 0
+        else:
+            dx = 0
+            dy = 1 if dy > 0 else -1
+            
+        new_x = x + dx
+        new_y = y + dy
+        
+        if self.is_valid_position(new_x, new_y):
+            return new_x, new_y
+        return x, y
+
+    def move_away(self, x, y, target_x, target_y):
+        """Move one step away from target"""
+        dx = x - target_x
+        dy = y - target_y
+        
+        # Move in direction of larger difference
+        if abs(dx) > abs(dy):
+            dx = 1 if dx > 0 else -1
+            dy = 0
+        else:
+            dx = 0
+            dy = 1 if dy > 0 else -1
+            
+        new_x = x + dx
+        new_y = y + dy
+        
+        if self.is_valid_position(new_x, new_y):
+            return new_x, new_y
+        return x, y
+
+    def random_move(self, x, y):
+        """Make a random move"""
+        for dx, dy in self.rng.choice(DIRECTION_ORDERS):
+            new_x, new_y = x + dx, y + dy
+            if self.is_valid_position(new_x, new_y) and self.is_empty(new_x, new_y):
+                return new_x, new_y
+        
+        return x, y  # Stay in place if no valid move
+
+    def find_closest_of_type(self, x, y, vision_dict, target_type):
+        """Find the closest entity of target_type within the searcher's vision radius"""
+        searcher = self.grid[y][x]
+        if isinstance(searcher, Animal):
+            radius = VISION_RADIUS[searcher.animal_type]
+        else:
+            radius = max(VISION_RADIUS.values())
+        stencil = vision_stencil(radius)
+        # Where targets are dense a stencil walk stops at a hit within a few
+        # cells; where they are sparse the spatial index skips the empty area
+        if self.index.count(target_type) * len(stencil) >= self.width * self.height:
+            return self.scan_closest_of_type(x, y, target_type, stencil)
+        return self.index.nearest(x, y, target_type, radius)
+
+    def scan_closest_of_type(self, x, y, target_type, stencil):
+        """Walk a distance-ordered stencil and return the first target_type hit"""
+        grid = self.grid
+        width, height = self.width, self.height
+        for _, dx, dy, _ in stencil:
+            new_x, new_y = x + dx, y + dy
+            if 0 <= new_x < width and 0 <= new_y < height:
+                cell = grid[new_y][new_x]
+                if cell is None:
+                    continue
+                cell_type = cell.animal_type if isinstance(cell, Animal) else cell
+                if cell_type == target_type:
+                    return new_x, new_y
+        return None
+
+    def apply_move(self, x, y, new_x, new_y, animal_type):
+        """Move animal to new position if possible"""
+        if not self.is_valid_position(new_x, new_y):
+            return False
+
+        # Get the animal at the target position (if any)
+        target_animal = self.grid[new_y][new_x]
+        
+        # Get the moving animal
+        animal = self.grid[y][x]
+        animal.x, animal.y = new_x, new_y
+            
+        # Handle plant eating - herbivores and omnivores can eat plants
+        if self.grid[new_y][new_x] == PLANT_TYPE:
+            if animal_type in ['herbivore', 'omnivore']:
+                # Only herbivores and omnivores eat and remove plants
+                self.plants.remove((new_x, new_y))
+                animal.feed()  # Reset hunger
+                if self.events.feeding:
+                    self.events.emit('feeding', animal_type, new_x, new_y)
+        
+        # If there's already an animal, cancel move
+        elif isinstance(target_animal, Animal):
+            return False
+        
+        # Update grid and sets
+        self.grid[new_y][new_x] = animal
+        self.grid[y][x] = None
+        self.cell_changed(x, y)
+        self.cell_changed(new_x, new_y)
+        
+        # Update the appropriate set
+        if animal_type == 'herbivore':
+            self.herbivores.remove((x, y))
+            self.herbivores.add((new_x, new_y))
+        elif animal_type == 'carnivore':
+            self.carnivores.remove((x, y))
+            self.carnivores.add((new_x, new_y))
+        elif animal_type == 'omnivore':
+            self.omnivores.remove((x, y))
+            self.omnivores.add((new_x, new_y))
+        
+        return True
+
+    def find_parent_nearby(self, x, y, animal_type):
+        """Find a potential parent of the same type at distance 1"""
+        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            new_x, new_y = x + dx, y + dy
+            if self.is_valid_position(new_x, new_y):
+                cell = self.grid[new_y][new_x]
+                if isinstance(cell, Animal) and cell.animal_type == animal_type:
+                    return cell
+        return None
+
+    def create_offspring(self, x, y, parent1, parent2, animal_type):
+        """Create a new animal with mixed genes from parents"""
+        genes = mix_genes(animal_type, parent1.genes, parent2.genes, self.rng.generator)
+        offspring = Animal(x, y, animal_type, is_offspring=True, genes=genes)
+        offspring.lifetime = self.ledger.birth(animal_type, genes)
+        return offspring
+
+    def update_animals(self):
+        """Update all animals based on their genes and vision"""
+        # Positions are sorted before shuffling. Set iteration order depends on
+        # the set's insertion history, which a restored snapshot can't recreate.
+        all_animals = sorted(self.herbivores) + sorted(self.carnivores) + sorted(self.omnivores)
+        self.rng.shuffle(all_animals)
+        metrics = self.metrics
+        metrics.start_step()
+        vision_calls = hunts = moves_attempted = moves_failed = births = kills = 0
+        
+        # First check for deaths from hunger and age
+        for x, y in list(all_animals):
+            if not self.grid[y][x]:  # Skip if already removed
+                continue
+            
+            animal = self.grid[y][x]
+            animal.hunger += 1
+            animal.age += 1  # Increment age
+            
+            # Let herbivores and omnivores eat plants they're standing on
+            if (animal.animal_type in ['herbivore', 'omnivore']) and (x, y) in self.plants:
+                self.plants.remove((x, y))
+                self.plant_changed(x, y)
+                animal.feed()
+                if self.events.feeding:
+                    self.events.emit('feeding', animal.animal_type, x, y)
+            
+            # Check if animal dies from hunger or age using type-specific values
+            cause = None
+            if animal.hunger >= HUNGER_DEATH[animal.animal_type]:
+                cause = 'hunger'
+            elif animal.age >= AGE_DEATH[animal.animal_type]:
+                cause = 'old age'
+            
+            if cause:
+                if self.events.death:
+                    self.events.emit('death', animal.animal_type, x, y, detail=cause)
+                self.ledger.death(animal.lifetime, cause)
+                self.grid[y][x] = None
+                self.cell_changed(x, y)
+                if animal.animal_type == 'herbivore':
+                    self.herbivores.remove((x, y))
+                elif animal.animal_type == 'carnivore':
+                    self.carnivores.remove((x, y))
+                elif animal.animal_type == 'omnivore':
+                    self.omnivores.remove((x, y))
+                continue
+        metrics.end_phase('aging')
+
+        # Then handle reproduction
+        for x, y in list(all_animals):
+            if not self.grid[y][x]:  # Skip if animal was eaten
+                continue
+                
+            animal = self.grid[y][x]
+            
+            # Skip reproduction if too hungry (hunger >= 50% of max)
+            if animal.hunger >= HUNGER_DEATH[animal.animal_type] / 2:
+                continue
+            
+            # Decrease reproduction cooldown if it's active
+            if animal.reproduction_cooldown > 0:
+                animal.reproduction_cooldown -= 1
+                continue  # Skip reproduction if on cooldown
+            
+            vision = self.get_vision(x, y, animal.animal_type)
+            vision_calls += 1
+            
+            # Check for reproduction (when same type is at distance 1)
+            if ((animal.animal_type == 'herbivore' and vision['herbivore'] == 1) or
+                (animal.animal_type == 'carnivore' and vision['carnivore'] == 1) or
+                (animal.animal_type == 'omnivore' and vision['omnivore'] == 1)):
+                
+                # Find the other parent
+                other_parent = self.find_parent_nearby(x, y, animal.animal_type)
+                # Also check if other parent is too hungry
+                if (not other_parent or 
+                    other_parent.reproduction_cooldown > 0 or 
+                    other_parent.hunger >= HUNGER_DEATH[other_parent.animal_type] / 2):
+                    continue
+                
+                # Find empty neighboring cells for offspring
+                empty_neighbors = []
+                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                    new_x, new_y = x + dx, y + dy
+                    if self.is_valid_position(new_x, new_y) and self.is_empty(new_x, new_y):
+                        empty_neighbors.append((new_x, new_y))
+                
+                # Create offspring in random empty neighbor cell
+                if empty_neighbors:
+                    offspring_x, offspring_y = self.rng.choice(empty_neighbors)
+                    offspring = self.create_offspring(offspring_x, offspring_y, animal, other_parent, animal.animal_type)
+                    self.grid[offspring_y][offspring_x] = offspring
+                    self.cell_changed(offspring_x, offspring_y)
+                    
+                    if animal.animal_type == 'herbivore':
+                        self.herbivores.add((offspring_x, offspring_y))
+                    elif animal.animal_type == 'carnivore':
+                        self.carnivores.add((offspring_x, offspring_y))
+                    elif animal.animal_type == 'omnivore':
+                        self.omnivores.add((offspring_x, offspring_y))
+                    
+                    if self.events.birth:
+                        self.events.emit('birth', animal.animal_type, offspring_x, offspring_y, x, y)
+                    animal.reproduction_cooldown = REPRODUCTION_COOLDOWNS[animal.animal_type]
+                    other_parent.reproduction_cooldown = REPRODUCTION_COOLDOWNS[other_parent.animal_type]
+                    animal.offspring_count += 1
+                    other_parent.offspring_count += 1
+                    self.ledger.mated(animal.lifetime, other_parent.lifetime)
+                    births += 1
+        metrics.end_phase('reproduction')
+        
+        # Then handle eating for omnivores
+        for x, y in sorted(self.omnivores):
+            if not self.grid[y][x]:  # Skip if dead
+                continue
+            animal = self.grid[y][x]
+            
+            # Only hunt if hungry enough (at least half of hunger death limit)
+            is_hungry_enough = animal.hunger >= HUNGER_DEATH[animal.animal_type] / 2
+            if not is_hungry_enough:
+                continue  # Don't pay for a vision scan that can't be used
+            vision = self.get_vision(x, y, animal.animal_type)
+            vision_calls += 1
+            hunts += 1
+            
+            if vision['herbivore'] == 1 and is_hungry_enough:  # Changed to only check for herbivores
+                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                    new_x, new_y = x + dx, y + dy
+                    if self.is_valid_position(new_x, new_y):
+                        target = self.grid[new_y][new_x]
+                        if isinstance(target, Animal) and target.animal_type == 'herbivore':
+                            self.herbivores.remove((new_x, new_y))
+                            self.ledger.death(target.lifetime, 'eaten')
+                            self.grid[new_y][new_x] = None
+                            self.cell_changed(new_x, new_y)
+                            animal.feed()  # Reset hunger when eating
+                            if self.events.predation:
+                                self.events.emit('predation', 'omnivore', x, y, new_x, new_y, 'herbivore')
+                            kills += 1
+                            break
+        metrics.end_phase('omnivore_predation')
+
+        # Then let carnivores eat herbivores and omnivores
+        for x, y in sorted(self.carnivores):
+            if not self.grid[y][x]:  # Skip if dead
+                continue
+            animal = self.grid[y][x]
+            
+            # Only hunt if hungry enough (at least half of hunger death limit)
+            is_hungry_enough = animal.hunger >= HUNGER_DEATH[animal.animal_type] / 2
+            if not is_hungry_enough:
+                continue  # Don't pay for a vision scan that can't be used
+            vision = self.get_vision(x, y, animal.animal_type)
+            vision_calls += 1
+            hunts += 1
+            
+            if (vision['herbivore'] == 1 or vision['omnivore'] == 1) and is_hungry_enough:
+                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                    new_x, new_y = x + dx, y + dy
+                    if self.is_valid_position(new_x, new_y):
+                        target = self.grid[new_y][new_x]
+                        if isinstance(target, Animal):
+                            if target.animal_type == 'herbivore':
+                                self.herbivores.remove((new_x, new_y))
+                                self.ledger.death(target.lifetime, 'eaten')
+                                self.grid[new_y][new_x] = None
+                                self.cell_changed(new_x, new_y)
+                                animal.feed()  # Reset hunger when eating
+                                if self.events.predation:
+                                    self.events.emit('predation', 'carnivore', x, y, new_x, new_y, 'herbivore')
+                                kills += 1
+                                break
+                            elif target.animal_type == 'omnivore':
+                                self.omnivores.remove((new_x, new_y))
+                                self.ledger.death(target.lifetime, 'eaten')
+                                self.grid[new_y][new_x] = None
+                                self.cell_changed(new_x, new_y)
+                                animal.feed()  # Reset hunger when eating
+                                if self.events.predation:
+                                    self.events.emit('predation', 'carnivore', x, y, new_x, new_y, 'omnivore')
+                                kills += 1
+                                break
+        metrics.end_phase('carnivore_predation')
+        
+        # Then proceed with normal movement
+        for x, y in all_animals:
+            # Skip if animal was eaten
+            if not self.grid[y][x]:
+                continue
+                
+            animal = self.grid[y][x]
+            vision = self.get_vision(x, y, animal.animal_type)
+            vision_calls += 1
+            vision_key = animal.get_vision_key(vision)
+            action = animal.genes[vision_key]
+            
+            # Force random move if stayed still too long
+            forced = animal.stationary_count >= 3
+            if forced:
+                action = Action.RANDOM_MOVE
+            
+            # Check if STAY is valid (only if same type is at distance 1)
+            if action == Action.STAY:
+                same_type_nearby = False
+                if animal.animal_type == 'herbivore' and vision['herbivore'] == 1:
+                    same_type_nearby = True
+                elif animal.animal_type == 'omnivore' and vision['omnivore'] == 1:
+                    same_type_nearby = True
+                elif animal.animal_type == 'carnivore' and vision['carnivore'] == 1:
+                    same_type_nearby = True
+                
+                if not same_type_nearby:
+                    # If STAY is not valid, do a random move instead
+                    action = Action.RANDOM_MOVE
+            
+            new_x, new_y = x, y  # Default to current position
+            
+            # Handle different actions
+            if action == Action.MOVE_TO_PLANT:
+                target = self.find_closest_of_type(x, y, vision, PLANT_TYPE)
+                if target:
+                    new_x, new_y = self.move_towards(x, y, *target)
+            
+            elif action == Action.MOVE_TO_HERBIVORE:
+                target = self.find_closest_of_type(x, y, vision, 'herbivore')
+                if target:
+                    new_x, new_y = self.move_towards(x, y, *target)
+            
+            elif action == Action.MOVE_TO_OMNIVORE:
+                target = self.find_closest_of_type(x, y, vision, 'omnivore')
+                if target:
+                    new_x, new_y = self.move_towards(x, y, *target)
+            
+            elif action == Action.MOVE_TO_CARNIVORE:
+                target = self.find_closest_of_type(x, y, vision, 'carnivore')
+                if target:
+                    new_x, new_y = self.move_towards(x, y, *target)
+            
+            elif action == Action.FLEE_FROM_HERBIVORE:
+                target = self.find_closest_of_type(x, y, vision, 'herbivore')
+                if target:
+                    new_x, new_y = self.move_away(x, y, *target)
+            
+            elif action == Action.FLEE_FROM_OMNIVORE:
+                target = self.find_closest_of_type(x, y, vision, 'omnivore')
+                if target:
+                    new_x, new_y = self.move_away(x, y, *target)
+            
+            elif action == Action.FLEE_FROM_CARNIVORE:
+                target = self.find_closest_of_type(x, y, vision, 'carnivore')
+                if target:
+                    new_x, new_y = self.move_away(x, y, *target)
+            
+            elif action == Action.RANDOM_MOVE:
+                new_x, new_y = self.random_move(x, y)
+            
+            # Apply the move if it changed position
+            success = False
+            if (new_x, new_y) != (x, y):
+                moves_attempted += 1
+                success = self.apply_move(x, y, new_x, new_y, animal.animal_type)
+                if success:
+                    animal.stationary_count = 0  # Reset counter on successful move
+                else:
+                    animal.stationary_count += 1  # Increment if couldn't move
+                    moves_failed += 1
+            else:
+                animal.stationary_count += 1  # Increment if chose not to move
+            
+            if self.events.movement:
+                destination = (new_x, new_y) if success else (x, y)
+                self.events.emit('movement', animal.animal_type, x, y, *destination,
+                                 f"{action.name} (forced)" if forced else action.name)
+        metrics.end_phase('movement')
+        metrics.end_step(vision_calls=vision_calls, hunts=hunts, moves_attempted=moves_attempted,
+                         moves_failed=moves_failed, births=births, kills=kills)
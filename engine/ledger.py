@@ -0,0 +1,121 @@
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+from config import ANIMAL_TYPES, TOP_PERFORMERS_TO_KEEP
+
+# 'stranded' animals found no room after crossing between the strips of engine.partition
+CAUSES = ('hunger', 'old age', 'eaten', 'stranded')
+TYPE_CODES = {animal_type: code for code, animal_type in enumerate(ANIMAL_TYPES)}
+CAUSE_CODES = {cause: code for code, cause in enumerate(CAUSES, start=1)}
+
+# One scored animal of Ledger.results. died and cause are None for animals
+# still alive at the end; genes is None unless it may be a top performer.
+Lifetime = namedtuple('Lifetime', ['animal_type', 'genes', 'born', 'died', 'cause',
+                                   'offspring_count', 'survival_time'])
+
+
+class Ledger:
+    """Birth, death and offspring of every animal of a simulation.
+
+    The grid records into it as things happen, which costs a few array
+    writes per birth, death and mating and nothing per step:
+
+        animal.lifetime = self.ledger.birth(animal_type, genes)
+        self.ledger.mated(animal.lifetime, other_parent.lifetime)
+        self.ledger.death(animal.lifetime, 'hunger')
+
+    and run_simulation sets `step` before every step. An animal is born in
+    the step it was created in (0 for the initial animals) and dies in the
+    step it is removed in, so it was alive for died - born steps.
+
+    Every lifetime is a row in a few NumPy columns. The genes are held for
+    the living animals and for the `keep` longest lived dead animals of every
+    type, which are all results() can rank first, so nothing else of a dead
+    animal is kept.
+
+    Every grid has one. A disabled ledger hands out -1 and every method
+    ignores -1, for grids whose animals are scored some other way.
+    """
+
+    COLUMNS = ('kind', 'born', 'died', 'cause', 'offspring')
+
+    def __init__(self, enabled=True, capacity=512, keep=TOP_PERFORMERS_TO_KEEP):
+        self.enabled = enabled
+        self.keep = keep
+        self.step = 0
+        self.count = 0  # Lifetimes recorded so far
+        self.kind = np.zeros(capacity, dtype=np.int8)  # Index in ANIMAL_TYPES
+        self.born = np.zeros(capacity, dtype=np.int32)
+        self.died = np.zeros(capacity, dtype=np.int32)
+        self.cause = np.zeros(capacity, dtype=np.int8)  # CAUSE_CODES, 0 while alive
+        self.offspring = np.zeros(capacity, dtype=np.int32)
+        self.genes = {}  # Lifetime -> genes of every living animal
+        # Min-heaps of (survival, -lifetime, genes), the longest lived dead per type
+        self.longest = {animal_type: [] for animal_type in ANIMAL_TYPES}
+
+    def _grow(self):
+        """Double the capacity of every column"""
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def birth(self, animal_type, genes):
+        """Record a new animal in the current step, return its lifetime id"""
+        if not self.enabled:
+            return -1
+        if self.count == len(self.kind):
+            self._grow()
+        lifetime = self.count
+        self.count += 1
+        self.kind[lifetime] = TYPE_CODES[animal_type]
+        self.born[lifetime] = self.step
+        self.genes[lifetime] = genes
+        return lifetime
+
+    def mated(self, parent1, parent2):
+        """Count an offspring for both parents"""
+        for parent in (parent1, parent2):
+            if parent >= 0:
+                self.offspring[parent] += 1
+
+    def death(self, lifetime, cause):
+        """Record that an animal died in the current step of cause (see CAUSES)"""
+        if lifetime < 0:
+            return
+        self.died[lifetime] = self.step
+        self.cause[lifetime] = CAUSE_CODES[cause]
+        entry = (self.step - int(self.born[lifetime]), -lifetime, self.genes.pop(lifetime))
+        heap = self.longest[ANIMAL_TYPES[self.kind[lifetime]]]
+        if len(heap) < self.keep:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def results(self, end):
+        """(Lifetime, survival_time) of every recorded animal in the order
+        they were born, after `end` steps
+
+        The survival time is the number of steps the animal was alive for.
+        Only the living animals and the `keep` longest lived dead animals of
+        every type come with their genes, so a stable sort by survival time
+        finds the genes of the top `keep` of every type.
+        """
+        count = self.count
+        dead = self.cause[:count] != 0
+        survival = (np.where(dead, self.died[:count], end) - self.born[:count]).tolist()
+        genes = dict(self.genes)
+        for heap in self.longest.values():
+            genes.update((-negative_lifetime, kept) for _, negative_lifetime, kept in heap)
+
+        results = []
+        for lifetime, (code, born, died, cause, offspring, is_dead) in enumerate(zip(
+                self.kind[:count].tolist(), self.born[:count].tolist(), self.died[:count].tolist(),
+                self.cause[:count].tolist(), self.offspring[:count].tolist(), dead.tolist())):
+            record = Lifetime(ANIMAL_TYPES[code], genes.get(lifetime), born, died if is_dead else None,
+                              CAUSES[cause - 1] if is_dead else None, offspring, survival[lifetime])
+            results.append((record, record.survival_time))
+        return results
@@ -0,0 +1,134 @@
+import time
+import pstats
+import cProfile
+import contextlib
+
+# The phases of update_animals, in order
+PHASES = ('aging', 'reproduction', 'omnivore_predation', 'carnivore_predation', 'movement')
+# hunts counts the hungry predators that looked for prey next to them
+COUNTERS = ('vision_calls', 'hunts', 'moves_attempted', 'moves_failed', 'births', 'kills')
+# Counters of engine.vision_cache.VisionCache, for grids that have one
+CACHE_COUNTERS = ('hits', 'misses', 'invalidations')
+
+
+class StepMetrics:
+    """Wall time per phase of update_animals and a few counters, per step.
+
+    The grid brackets every step and phase:
+
+        self.metrics.start_step()
+        ...
+        self.metrics.end_phase('aging')
+        ...
+        self.metrics.end_step(vision_calls=..., births=...)
+
+    The counters are counted in local variables and handed over once per
+    step, and a disabled StepMetrics returns from every call right away, so
+    the cost is a few calls per step either way. Every grid has a disabled
+    one; run_simulation swaps in the one it is given.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.steps = []  # One dict of phase seconds and counters per step
+        self.vision_cache = None  # CACHE_COUNTERS of the grid's vision cache, set at the end of a run
+        self.current = None
+        self.mark = 0.0
+
+    def start_step(self):
+        if not self.enabled:
+            return
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.mark = time.perf_counter()
+
+    def end_phase(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] += now - self.mark
+        self.mark = now
+
+    def end_step(self, **counters):
+        if not self.enabled:
+            return
+        self.current.update(dict.fromkeys(COUNTERS, 0), **counters)
+        self.steps.append(self.current)
+        self.current = None
+
+    def per_step(self):
+        """The recorded steps, oldest first"""
+        return list(self.steps)
+
+    def totals(self):
+        """Phase seconds and counters summed over all recorded steps"""
+        totals = dict.fromkeys(PHASES, 0.0)
+        totals.update(dict.fromkeys(COUNTERS, 0))
+        for step in self.steps:
+            for name in totals:
+                totals[name] += step[name]
+        return totals
+
+    def summary(self):
+        """Totals, per-step means and the share of time of every phase"""
+        return summarize(len(self.steps), self.totals(), self.vision_cache)
+
+
+def summarize(steps, totals, vision_cache=None):
+    phase_time = sum(totals[phase] for phase in PHASES)
+    summary = {
+        'steps': steps,
+        'phases': {phase: {'seconds': totals[phase],
+                           'ms_per_step': totals[phase] * 1000 / steps if steps else 0.0,
+                           'share': totals[phase] / phase_time if phase_time else 0.0}
+                   for phase in PHASES},
+        'counters': {counter: {'total': totals[counter],
+                               'per_step': totals[counter] / steps if steps else 0.0}
+                     for counter in COUNTERS},
+    }
+    if vision_cache is not None:
+        lookups = vision_cache['hits'] + vision_cache['misses']
+        summary['vision_cache'] = dict(vision_cache, hit_rate=vision_cache['hits'] / lookups if lookups else 0.0)
+    return summary
+
+
+def merge_summaries(summaries):
+    """Combine the summaries of several simulations into one"""
+    steps = sum(summary['steps'] for summary in summaries)
+    totals = {phase: sum(summary['phases'][phase]['seconds'] for summary in summaries) for phase in PHASES}
+    totals.update({counter: sum(summary['counters'][counter]['total'] for summary in summaries)
+                   for counter in COUNTERS})
+    caches = [summary['vision_cache'] for summary in summaries if 'vision_cache' in summary]
+    vision_cache = {counter: sum(cache[counter] for cache in caches) for counter in CACHE_COUNTERS} if caches else None
+    return summarize(steps, totals, vision_cache)
+
+
+def describe(summary):
+    """One line with the time per step of every phase"""
+    phases = ', '.join(f"{phase} {entry['ms_per_step']:.2f} ms ({entry['share']:.0%})"
+                       for phase, entry in summary['phases'].items())
+    return f"Per step: {phases}"
+
+
+def describe_vision_cache(summary):
+    """One line with the vision cache hits and misses, or None without a cache"""
+    cache = summary.get('vision_cache')
+    if cache is None:
+        return None
+    return (f"Vision cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"({cache['hit_rate']:.0%} of scans skipped)")
+
+
+@contextlib.contextmanager
+def profiled(path=None, limit=30):
+    """Run the body under cProfile, then save the stats to path (for
+    pstats or snakeviz) or print the `limit` most expensive calls"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        else:
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
@@ -0,0 +1,469 @@
+import bisect
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import GRID_WIDTH, GRID_HEIGHT, VISION_RADIUS, SIMULATION_STEPS
+from engine.metrics import StepMetrics
+from engine.simulation import create_world
+from engine.stencils import vision_stencil
+from engine.world import ANIMAL_CODES, CARNIVORE, NEIGHBOR_OFFSETS, ArrayGrid
+
+# Every worker sees this many rows of its neighbors, enough for the widest vision
+HALO = max(VISION_RADIUS.values())
+# animal_layer value of a halo cell holding another worker's animal
+GHOST = np.iinfo(np.int32).max
+# What travels with an animal that crosses into another strip
+MIGRANT_COLUMNS = ('kind', 'hunger', 'age', 'cooldown', 'stationary', 'offspring', 'lifetime')
+# Offsets by distance, the cell itself first, for placing migrants
+CLOSEST_FIRST = ((0, 0, 0, False),) + vision_stencil(HALO)
+
+
+class StripLedger:
+    """Stands in for the engine.ledger.Ledger of a StripGrid.
+
+    Animals move between strips, so no strip can keep the ledger of their
+    lives. Instead every strip writes down the births, matings and deaths
+    of a step, and PartitionedWorld.record enters them into the ledger of
+    the whole world. New animals get the ids first, first + stride, ... so
+    that the ids of all strips differ until the parent replaces them with
+    ids of its own ledger.
+    """
+
+    def __init__(self, first=0, stride=1):
+        self.next_lifetime = first
+        self.stride = stride
+        self.births = []  # (lifetime, animal_type, genes)
+        self.matings = []  # (parent1, parent2)
+        self.deaths = []  # (lifetime, cause)
+
+    def birth(self, animal_type, genes):
+        lifetime = self.next_lifetime
+        self.next_lifetime += self.stride
+        self.births.append((lifetime, animal_type, genes))
+        return lifetime
+
+    def mated(self, parent1, parent2):
+        self.matings.append((parent1, parent2))
+
+    def death(self, lifetime, cause):
+        self.deaths.append((lifetime, cause))
+
+    def entries(self):
+        """The births, matings and deaths written down since the last call"""
+        entries = (self.births, self.matings, self.deaths)
+        self.births, self.matings, self.deaths = [], [], []
+        return entries
+
+
+class StripGrid(ArrayGrid):
+    """The part of a partitioned world one worker process simulates.
+
+    Holds the rows first..last of the map it owns plus up to HALO rows of
+    its neighbors above and below, all in local coordinates shifted by
+    `offset`. The halo rows are copies of the neighbors' plant and kind
+    layers, refreshed before every step. Animals there are ghosts: they
+    block moves and show up in vision, but can't be eaten or mated with.
+
+    Plants spread and animals move or are born into the halo like anywhere
+    else. Those plants are handed to the owner of the row as requests, and
+    the animals leave the strip as migrants after the step.
+
+    The `lifetime` column stays with an animal across strips. Its ledger is
+    a StripLedger, see there.
+    """
+
+    def __init__(self, width, height, offset, first, last, capacity=512, batched_vision=False, seed=None):
+        super().__init__(width, height, capacity, batched_vision, seed=seed)
+        self.ledger = StripLedger()
+        self.offset = offset
+        self.rows = (first - offset, last - offset)  # Owned rows, local
+
+    @classmethod
+    def from_world(cls, world, first, last, ledger=None, seed=None):
+        """Cut rows first..last and their halo out of an ArrayGrid, with a
+        StripLedger for the animals born in the strip"""
+        top, bottom = max(0, first - HALO), min(world.height, last + HALO)
+        strip = cls(world.width, bottom - top, top, first, last, batched_vision=world.batched_vision, seed=seed)
+        if ledger is not None:
+            strip.ledger = ledger
+        strip.plant_layer[:] = world.plant_layer[top:bottom]
+        strip.refresh_halo(world.plant_layer, world.kind_layer)
+        for slot in world.living_slots().tolist():
+            if first <= world.ys[slot] < last:
+                record = {name: getattr(world, name)[slot].item() for name in MIGRANT_COLUMNS}
+                record.update(x=int(world.xs[slot]), y=int(world.ys[slot]), genes=world.genomes[world.genome[slot]])
+                strip.insert(record, record['x'], record['y'] - top)
+        return strip
+
+    def owns(self, y):
+        """Whether local row y belongs to this strip"""
+        return self.rows[0] <= y < self.rows[1]
+
+    def halo_rows(self):
+        """(local, global) slices of the halo above and below the owned rows"""
+        first, last = self.rows
+        return [(slice(0, first), slice(self.offset, self.offset + first)),
+                (slice(last, self.height), slice(self.offset + last, self.offset + self.height))]
+
+    def refresh_halo(self, plants, kinds):
+        """Copy the neighbors' rows from the map-wide plant and kind layers"""
+        for local, rows in self.halo_rows():
+            self.plant_layer[local] = plants[rows]
+            self.kind_layer[local] = kinds[rows]
+            self.animal_layer[local] = np.where(kinds[rows] != 0, GHOST, -1)
+
+    def publish(self, plants, kinds):
+        """Copy the owned rows into the map-wide plant and kind layers"""
+        first, last = self.rows
+        plants[self.offset + first:self.offset + last] = self.plant_layer[first:last]
+        kinds[self.offset + first:self.offset + last] = self.kind_layer[first:last]
+
+    def find_parent_nearby(self, x, y, animal_type):
+        """Like ArrayGrid.find_parent_nearby, ghosts don't count"""
+        code = ANIMAL_CODES[animal_type]
+        for dx, dy in NEIGHBOR_OFFSETS:
+            new_x, new_y = x + dx, y + dy
+            if (self.is_valid_position(new_x, new_y) and self.kind_layer[new_y, new_x] == code and
+                    self.animal_layer[new_y, new_x] != GHOST):
+                return int(self.animal_layer[new_y, new_x])
+        return None
+
+    def _hunt(self, slot, prey_codes):
+        """Like ArrayGrid._hunt, ghosts can't be eaten"""
+        x, y = int(self.xs[slot]), int(self.ys[slot])
+        for dx, dy in NEIGHBOR_OFFSETS:
+            new_x, new_y = x + dx, y + dy
+            if (self.is_valid_position(new_x, new_y) and self.kind_layer[new_y, new_x] in prey_codes and
+                    self.animal_layer[new_y, new_x] != GHOST):
+                prey = self.animal_layer[new_y, new_x]
+                self.ledger.death(int(self.lifetime[prey]), 'eaten')
+                self._remove(prey)
+                self.hunger[slot] = 0
+                return True
+        return False
+
+    def update_plants(self):
+        """Spread the owned plants, return the new plants in the halo as
+        global (x, y) for their owners"""
+        ys, xs = self.plant_spread(self.rows)
+        owned = (ys >= self.rows[0]) & (ys < self.rows[1])
+        self.plant_layer[ys[owned], xs[owned]] = True
+        return list(zip(xs[~owned].tolist(), (ys[~owned] + self.offset).tolist()))
+
+    def add_plants(self, cells):
+        """Add plants that spread in from a neighbor, given as global (x, y)"""
+        for x, y in cells:
+            self.add_plant(x, y - self.offset)
+
+    def emigrants(self):
+        """Take every animal that ended the step in the halo out of the strip,
+        return them as records with global coordinates"""
+        slots = self.living_slots()
+        slots = slots[~((self.ys[slots] >= self.rows[0]) & (self.ys[slots] < self.rows[1]))]
+        records = []
+        for slot in slots.tolist():
+            record = {name: getattr(self, name)[slot].item() for name in MIGRANT_COLUMNS}
+            record.update(x=int(self.xs[slot]), y=int(self.ys[slot]) + self.offset,
+                          genes=self.genomes[self.genome[slot]])
+            records.append(record)
+            # The animal lives on in another strip
+            self._remove(slot)
+        return records
+
+    def free_cell_near(self, x, y):
+        """The closest owned cell without an animal, or None within HALO"""
+        for _, dx, dy, _ in CLOSEST_FIRST:
+            new_x, new_y = x + dx, y + dy
+            if self.is_valid_position(new_x, new_y) and self.owns(new_y) and self.animal_layer[new_y, new_x] < 0:
+                return new_x, new_y
+        return None
+
+    def place_migrant(self, record):
+        """Put an animal from a record on its cell or the closest free one
+
+        Returns False if there is no room within HALO.
+        """
+        cell = self.free_cell_near(record['x'], record['y'] - self.offset)
+        if cell is None:
+            return False
+        x, y = cell
+        slot = self.insert(record, x, y)
+        # Grazers eat the plant they arrive on, as in apply_move
+        if record['kind'] != CARNIVORE and self.plant_layer[y, x]:
+            self.plant_layer[y, x] = False
+            self.hunger[slot] = 0
+        return True
+
+    def insert(self, record, x, y):
+        """Place the animal of a record on the local cell (x, y), return its slot"""
+        slot = self._place(x, y, record['kind'], self.genomes.intern(record['genes']), is_offspring=False)
+        for name in MIGRANT_COLUMNS:
+            getattr(self, name)[slot] = record[name]
+        return slot
+
+    def strand(self, record):
+        """Record an animal that found no room on either side of a border as dead"""
+        self.ledger.death(record['lifetime'], 'stranded')
+
+
+def strip_worker(connection, strip, memory_name, shape, metrics_enabled):
+    """Run one strip on the commands of a PartitionedWorld (runs in its own process)"""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    plants, kinds = shared_layers(memory, shape)
+    try:
+        strip.metrics = StepMetrics(enabled=metrics_enabled)
+        while True:
+            command, payload = connection.recv()
+            try:
+                if command == 'plants':
+                    strip.refresh_halo(plants, kinds)
+                    reply = strip.update_plants()
+                elif command == 'animals':
+                    strip.add_plants(payload)
+                    strip.update_animals()
+                    reply = strip.emigrants()
+                elif command == 'arrive':
+                    reply = [record for record in payload if not strip.place_migrant(record)]
+                elif command == 'settle':
+                    for record in payload:
+                        if not strip.place_migrant(record):
+                            strip.strand(record)
+                    strip.publish(plants, kinds)
+                    reply = (strip.animal_count(), strip.ledger.entries())
+                elif command == 'finish':
+                    reply = strip.metrics.per_step()
+                else:
+                    break
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+                break
+            connection.send(('ok', reply))
+    finally:
+        del plants, kinds
+        memory.close()
+
+
+def shared_layers(memory, shape):
+    """The map-wide plant and kind layers in a shared memory block"""
+    size = shape[0] * shape[1]
+    plants = np.ndarray(shape, dtype=bool, buffer=memory.buf[:size])
+    kinds = np.ndarray(shape, dtype=np.int8, buffer=memory.buf[size:2 * size])
+    return plants, kinds
+
+
+class LayerView:
+    """Positions of the plants and animals of a partitioned world, for the
+    renderer, read from the shared layers"""
+
+    def __init__(self, plants, kinds):
+        self.plant_layer = plants
+        self.kind_layer = kinds
+
+    @property
+    def plants(self):
+        ys, xs = np.nonzero(self.plant_layer)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    def positions_of(self, animal_type):
+        ys, xs = np.nonzero(self.kind_layer == ANIMAL_CODES[animal_type])
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    @property
+    def herbivores(self):
+        return self.positions_of('herbivore')
+
+    @property
+    def carnivores(self):
+        return self.positions_of('carnivore')
+
+    @property
+    def omnivores(self):
+        return self.positions_of('omnivore')
+
+
+class PartitionedWorld:
+    """One world simulated by several processes, one horizontal strip each.
+
+    The plant and kind layers of the whole map live in shared memory. Each
+    step every worker copies its halo (HALO rows from each neighbor) out of
+    them, spreads its plants and moves its animals, and writes its own rows
+    back. Plants that spread across a border and animals that moved or were
+    born across one are routed to the owning worker through the parent in
+    between. A migrant whose cell was taken in the meantime goes to the
+    closest free cell, first in its new strip, then back in its old one.
+
+    Across borders the workers see each other as of the start of the step,
+    and ghosts in the halo can't be eaten or mated with. Apart from that
+    the rules are the ones of ArrayGrid, so the results match the serial
+    engine statistically, not step for step.
+
+    The ledger of the world's ArrayGrid becomes the ledger of the whole
+    partitioned world: after every step it takes in what the StripLedgers
+    of the workers wrote down, see record.
+    """
+
+    def __init__(self, world, workers, metrics_enabled=False):
+        if not 1 <= workers <= world.height:
+            raise ValueError(f"Can't split {world.height} rows into {workers} strips")
+        self.width, self.height = world.width, world.height
+        self.ledger = world.ledger
+        self.steps = 0  # Steps done so far
+        # Strip ids of the animals born in the strips -> their ids in self.ledger
+        self.lifetimes = {}
+        shape = (self.height, self.width)
+        self.memory = shared_memory.SharedMemory(create=True, size=2 * self.height * self.width)
+        self.plants, self.kinds = shared_layers(self.memory, shape)
+        self.plants[:] = world.plant_layer
+        self.kinds[:] = world.kind_layer
+        self.view = LayerView(self.plants, self.kinds)
+
+        bounds = np.linspace(0, self.height, workers + 1).astype(int).tolist()
+        self.bounds = list(zip(bounds[:-1], bounds[1:]))
+        seeds = world.rng.generator.integers(2 ** 63, size=workers).tolist()
+        # Spawn, like graphics.capture, so workers start clean of the parent's threads
+        context = multiprocessing.get_context('spawn')
+        self.connections = []
+        self.processes = []
+        for index, ((first, last), strip_seed) in enumerate(zip(self.bounds, seeds)):
+            # Strip ids start after the ids the world's ledger has handed out
+            strip = StripGrid.from_world(world, first, last, StripLedger(self.ledger.count + index, workers),
+                                         seed=strip_seed)
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=strip_worker, daemon=True,
+                                      args=(child_end, strip, self.memory.name, shape, metrics_enabled))
+            process.start()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        self.population = world.animal_count()
+
+    def owner(self, y):
+        """Index of the strip that owns row y"""
+        return bisect.bisect_right(self.bounds, y, key=lambda bound: bound[0]) - 1
+
+    def command(self, command, payloads=None):
+        """Send a command to every worker and return their replies"""
+        for index, connection in enumerate(self.connections):
+            connection.send((command, payloads[index] if payloads else None))
+        # Every worker replies before any is stopped, or close() could wait
+        # on a worker that is still sending
+        replies, errors = [], []
+        for connection in self.connections:
+            status, reply = connection.recv()
+            if status == 'error':
+                errors.append(reply)
+            replies.append(reply)
+        if errors:
+            self.close()
+            raise RuntimeError("Partition worker failed:\n" + "\n".join(errors))
+        return replies
+
+    def route(self, items, y_of):
+        """Sort items from all workers into one list per owning worker"""
+        routed = [[] for _ in self.connections]
+        for worker_items in items:
+            for item in worker_items:
+                routed[self.owner(y_of(item))].append(item)
+        return routed
+
+    def step(self):
+        """Advance the whole world by one step"""
+        new_plants = self.command('plants')
+        migrants = self.command('animals', self.route(new_plants, lambda cell: cell[1]))
+        for source, records in enumerate(migrants):
+            for record in records:
+                record['source'] = source
+        rejected = self.command('arrive', self.route(migrants, lambda record: record['y']))
+        # Animals that found no room go back to the strip they came from
+        returns = [[] for _ in self.connections]
+        for records in rejected:
+            for record in records:
+                returns[record['source']].append(record)
+        settled = self.command('settle', returns)
+        self.population = sum(count for count, _ in settled)
+        self.record([entries for _, entries in settled])
+        self.steps += 1
+
+    def record(self, entries):
+        """Enter the births, matings and deaths of a step from the
+        StripLedger of every worker into the world's ledger
+
+        An animal may be born in one strip and die in another in the same
+        step, so all births go first.
+        """
+        ledger, lifetimes = self.ledger, self.lifetimes
+        ledger.step = self.steps
+        for births, _, _ in entries:
+            for lifetime, animal_type, genes in births:
+                lifetimes[lifetime] = ledger.birth(animal_type, genes)
+        # Ids below the first strip id are the world's own
+        for _, matings, _ in entries:
+            for parent1, parent2 in matings:
+                ledger.mated(lifetimes.get(parent1, parent1), lifetimes.get(parent2, parent2))
+        for _, _, deaths in entries:
+            for lifetime, cause in deaths:
+                ledger.death(lifetimes.pop(lifetime, lifetime), cause)
+
+    def animal_count(self):
+        return self.population
+
+    def results(self, metrics=None):
+        """(engine.ledger.Lifetime, survival_time) of every animal, like
+        run_simulation returns, and the per-step metrics of all workers
+        added up"""
+        replies = self.command('finish')
+        if metrics is not None:
+            for steps in zip(*replies):
+                metrics.steps.append({name: sum(step[name] for step in steps) for name in steps[0]})
+        return self.ledger.results(self.steps)
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        if self.memory is None:
+            return
+        for connection, process in zip(self.connections, self.processes):
+            try:
+                connection.send(('stop', None))
+            except OSError:
+                pass
+            process.join()
+        del self.view, self.plants, self.kinds
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+
+def run_partitioned(initial_genes=None, workers=2, renderer=None, generation=0, simulation=0,
+                    batched_vision=False, seed=None, metrics=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Run a single simulation split over `workers` processes
+
+    Creates the same world as run_simulation with the array backend and
+    simulates it with a PartitionedWorld. Returns (Lifetime, survival_time)
+    of every animal like run_simulation. A metrics object receives the phase
+    times and counters of all workers added up per step.
+    """
+    if renderer:
+        renderer.show_message(f"Starting Generation {generation + 1}, Simulation {simulation + 1}")
+
+    grid, _ = create_world(initial_genes, 'batched' if batched_vision else 'array', seed=seed,
+                                     width=width, height=height)
+    world = PartitionedWorld(grid, workers, metrics_enabled=metrics is not None)
+    try:
+        all_animals_dead = False
+        for step in range(SIMULATION_STEPS):
+            world.step()
+            all_animals_dead = world.animal_count() == 0
+            if all_animals_dead:
+                print(f"All animals died in simulation {simulation} at step {step}")
+                break
+            if renderer:
+                renderer.draw(world.view, generation, simulation, step)
+
+        if renderer and not all_animals_dead:
+            renderer.draw(world.view, generation, simulation, SIMULATION_STEPS - 1, force=True)
+            renderer.show_message(f"Generation {generation + 1}, Simulation {simulation + 1} Complete")
+        return world.results(metrics)
+    finally:
+        world.close()
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+
+class BatchedRandom:
+    """Seeded random source that draws its numbers from NumPy in bulk.
+
+    Every Grid owns one, so a simulation is fully determined by its seed and
+    does not touch the global random module. Scalar draws (coin flips,
+    choices) are served from a buffer of pre-drawn floats, so each costs a
+    list index rather than a call into the random module, and shuffles and
+    batches of draws are single NumPy calls. Vectorized code can draw from
+    `generator` directly, which is the same seeded stream.
+
+    The seed may be an int, a sequence of ints or None, in which case one is
+    taken from the random module so random.seed still makes runs repeatable.
+    """
+
+    def __init__(self, seed=None, buffer_size=4096):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.generator = np.random.default_rng(seed)
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.position = 0
+
+    def random(self):
+        """A float in [0, 1)"""
+        if self.position == len(self.buffer):
+            self.buffer = self.generator.random(self.buffer_size).tolist()
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def floats(self, count):
+        """A list of count floats in [0, 1), for loops that need one draw per item"""
+        return self.generator.random(count).tolist()
+
+    def below(self, n):
+        """An int in [0, n)"""
+        return int(self.random() * n)
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def shuffle(self, items):
+        """Shuffle a list in place"""
+        items[:] = [items[i] for i in self.generator.permutation(len(items)).tolist()]
@@ -0,0 +1,248 @@
+import os
+import json
+import random
+import contextlib
+from datetime import datetime
+
+from config import (
+    GRID_WIDTH, GRID_HEIGHT, INITIAL_PLANTS, INITIAL_HERBIVORES, INITIAL_CARNIVORES,
+    INITIAL_OMNIVORES, ANIMAL_TYPES, SIMULATION_STEPS, SNAPSHOT_INTERVAL
+)
+from engine.animal import Action
+from engine.grid import Grid
+from engine.gene_bank import save_gene_bank
+from engine.genome import as_genome
+from engine.events import EventLog
+from engine.metrics import CACHE_COUNTERS, StepMetrics, profiled
+from engine.snapshot import SnapshotWriter
+
+
+def create_grid(width, height, backend='grid', events=None, seed=None):
+    """Create an empty world using the given backend
+
+    'grid' is the reference list-of-lists Grid, 'array' the NumPy-backed
+    ArrayGrid from engine.world, 'batched' an ArrayGrid that computes the
+    vision of all animals in one pass per phase and 'chunked' the
+    ChunkedGrid from engine.chunked, which only allocates the parts of the
+    map that hold something. Events go to the given
+    engine.events.EventLog and all randomness comes from a generator seeded
+    with seed (see engine.rng.BatchedRandom).
+    """
+    if backend in ('array', 'batched'):
+        from engine.world import ArrayGrid
+        return ArrayGrid(width, height, batched_vision=backend == 'batched', events=events, seed=seed)
+    if backend == 'chunked':
+        from engine.chunked import ChunkedGrid
+        return ChunkedGrid(width, height, events=events, seed=seed)
+    if backend != 'grid':
+        raise ValueError(f"Unknown world backend: {backend}")
+    return Grid(width, height, events=events, seed=seed)
+
+
+def create_world(initial_genes=None, backend='grid', events=None, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Create a width by height grid with the initial plants and animals
+
+    Returns the grid and the list of initial animals whose survival is scored.
+    """
+    animal_counts = {
+        'herbivore': INITIAL_HERBIVORES,
+        'carnivore': INITIAL_CARNIVORES,
+        'omnivore': INITIAL_OMNIVORES
+    }
+    if width * height < sum(animal_counts.values()):
+        raise ValueError(f"A {width}x{height} map has no room for {sum(animal_counts.values())} animals")
+
+    # Create a new grid for this simulation
+    grid = create_grid(width, height, backend, events, seed)
+    generator = grid.rng.generator
+    
+    # Initialize grid with plants (several may land on the same cell)
+    for cell in generator.integers(0, width * height, INITIAL_PLANTS).tolist():
+        grid.add_plant(cell % width, cell // width)
+    
+    # Animals go to distinct cells in random order, which is the same as
+    # drawing random cells until a free one comes up
+    free_cells = iter(generator.permutation(width * height).tolist())
+    all_animals = []
+    for animal_type, count in animal_counts.items():
+        # Every gene set is converted once and then shared by the animals
+        # that start with it
+        pool = [as_genome(animal_type, genes) for genes in initial_genes[animal_type]] if initial_genes else []
+        for i in range(count):
+            cell = next(free_cells)
+            x, y = cell % width, cell // width
+            genes = None
+            if pool:
+                # Use modulo to cycle through available genes
+                genes = pool[i % len(pool)]
+            
+            grid.add_animal(x, y, animal_type, genes=genes)
+            all_animals.append(grid.animal_at(x, y))
+    
+    return grid, all_animals
+
+
+def world_state(grid, step, generation, simulation, backend):
+    """Everything needed to resume a simulation after `step`, for engine.snapshot"""
+    return {
+        'kind': 'world',
+        'grid': grid,
+        'step': step,
+        'generation': generation,
+        'simulation': simulation,
+        'backend': backend,
+        'random_state': random.getstate()
+    }
+
+
+def run_simulation(initial_genes=None, renderer=None, generation=0, simulation=0, backend='grid', events=None,
+                   snapshot_path=None, resume=None, seed=None, metrics=None, profile_step=None,
+                   profile_path=None, partitions=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Run a single simulation and return the results
+
+    The results are (engine.ledger.Lifetime, survival_time) for every animal
+    that lived, the initial animals first and their offspring in order of
+    birth, where survival_time is the number of steps the animal was alive
+    for. Only the animals that may rank among the TOP_PERFORMERS_TO_KEEP of
+    their type come with genes, see Ledger.results.
+
+    The simulation itself is headless. Pass a renderer (see graphics.renderer)
+    to have every step drawn to a window and an engine.events.EventLog to
+    record births, deaths, meals and moves. The log is left open so it can be
+    shared by several simulations.
+
+    With snapshot_path the full world state is written there every
+    SNAPSHOT_INTERVAL steps, in the background. Passing such a snapshot
+    (see engine.snapshot.load_snapshot) as resume continues the simulation
+    exactly where it was taken, instead of creating a new world.
+
+    The same seed always gives the same simulation. Without one, a seed is
+    drawn from the random module. A new world is width by height cells; a
+    resumed one keeps the size it was saved with.
+
+    Pass an engine.metrics.StepMetrics as metrics to have the time of every
+    phase of update_animals and a few counters recorded per step. With
+    profile_step, that one step runs under cProfile, whose stats are saved
+    to profile_path or printed.
+
+    With partitions, the world is split into that many strips simulated by
+    separate processes, see engine.partition. The partitioned run always
+    uses the array backend ('batched' keeps its batched vision) and
+    supports neither events, snapshots nor profiling.
+    """
+    if partitions:
+        if events is not None or snapshot_path or resume or profile_step is not None:
+            raise ValueError("Partitioned simulations don't support events, snapshots or profiling")
+        from engine.partition import run_partitioned
+        return run_partitioned(initial_genes, partitions, renderer, generation, simulation,
+                               batched_vision=backend == 'batched', seed=seed, metrics=metrics,
+                               width=width, height=height)
+    if renderer:
+        renderer.show_message(f"Starting Generation {generation + 1}, Simulation {simulation + 1}")
+    
+    if resume:
+        grid = resume['grid']
+        grid.events = events if events is not None else EventLog()
+        random.setstate(resume['random_state'])
+        first_step = resume['step'] + 1
+    else:
+        # The grid's ledger keeps track of the animals, see engine.ledger
+        grid, _ = create_world(initial_genes, backend, events, seed, width, height)
+        first_step = 0
+    grid.events.simulation = simulation
+    grid.metrics = metrics if metrics is not None else StepMetrics(enabled=False)
+    snapshots = SnapshotWriter() if snapshot_path else None
+    
+    # Run simulation for specified steps or until all animals die
+    all_animals_dead = False
+    steps_done = first_step
+    for step in range(first_step, SIMULATION_STEPS):
+        grid.events.step = step
+        grid.ledger.step = step
+        with profiled(profile_path) if step == profile_step else contextlib.nullcontext():
+            grid.update_plants()
+            grid.update_animals()
+        steps_done = step + 1
+        
+        # Check if all animals are dead
+        all_animals_dead = grid.animal_count() == 0
+        
+        if all_animals_dead:
+            print(f"All animals died in simulation {simulation} at step {step}")
+            break
+        
+        if snapshots and (step + 1) % SNAPSHOT_INTERVAL == 0:
+            snapshots.submit(snapshot_path, world_state(grid, step, generation, simulation, backend))
+        
+        if renderer:
+            renderer.draw(grid, generation, simulation, step)
+    
+    if snapshots:
+        snapshots.close()
+    
+    if metrics is not None and grid.vision_cache is not None:
+        stats = grid.vision_cache.stats()
+        metrics.vision_cache = {counter: stats[counter] for counter in CACHE_COUNTERS}
+    
+    if renderer and not all_animals_dead:
+        # The last steps may have been dropped, show the final state
+        renderer.draw(grid, generation, simulation, SIMULATION_STEPS - 1, force=True)
+        # Only show completion message if simulation ran full course
+        renderer.show_message(f"Generation {generation + 1}, Simulation {simulation + 1} Complete")
+    
+    # Fitness of every animal that lived, from the ledger
+    return grid.ledger.results(steps_done)
+
+def save_simulation_results(simulation_count, type_results_dict, best_genes, metrics=None):
+    """Save simulation results and best genes to files
+
+    metrics is an engine.metrics summary, saved with the statistics.
+    """
+    # Create results directory if it doesn't exist
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base_dir = f"simulation_results/{timestamp}"
+    os.makedirs(base_dir, exist_ok=True)
+    
+    # Save simulation statistics
+    stats = {}
+    for animal_type, type_results in type_results_dict.items():
+        if type_results:
+            survival_times = [survival for _, survival in type_results]
+            stats[animal_type] = {
+                "avg_survival": sum(survival_times) / len(survival_times),
+                "max_survival": max(survival_times),
+                "total_animals": len(type_results),
+                "top_3_survival_times": sorted(survival_times, reverse=True)[:3]
+            }
+    if metrics:
+        stats["metrics"] = metrics
+    
+    with open(f"{base_dir}/simulation_{simulation_count}_stats.json", 'w') as f:
+        json.dump(stats, f, indent=4)
+    
+    # Save top 3 genes for each type
+    save_gene_bank(f"{base_dir}/best_genes_{simulation_count}.npz",
+                   {animal_type: best_genes[animal_type][:3] for animal_type in ANIMAL_TYPES
+                    if best_genes[animal_type]})
+
+def load_genes(filepath):
+    """Load genes from a JSON file written by older versions
+
+    Results are saved as gene banks now, see engine.gene_bank.load_gene_bank.
+    """
+    with open(filepath, 'r') as f:
+        serialized_genes = json.load(f)
+    
+    # Convert back to proper format
+    genes = []
+    for serialized_gene in serialized_genes:
+        gene = {}
+        for key_str, action_str in serialized_gene.items():
+            # Convert string tuple to actual tuple
+            key = tuple(map(int, key_str.strip('()').split(', ')))
+            # Convert string to Action enum
+            action = Action[action_str]
+            gene[key] = action
+        genes.append(gene)
+    
+    return genes
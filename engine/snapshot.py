@@ -0,0 +1,82 @@
+import os
+import pickle
+import threading
+
+SNAPSHOT_VERSION = 2
+
+
+def capture(state):
+    """Serialize a snapshot state dict to bytes.
+
+    This is the only part of taking a snapshot that runs on the simulation
+    thread. It copies the state, so the simulation can go on changing it.
+    """
+    return pickle.dumps({'version': SNAPSHOT_VERSION, **state}, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def write_atomic(path, data):
+    """Write to a temporary file and rename it, so a crash mid-write never
+    leaves a truncated snapshot behind"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def save_snapshot(path, state):
+    write_atomic(path, capture(state))
+
+
+def load_snapshot(path):
+    """Read a snapshot back, or return None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is snapshot version {state.get('version')}, expected {SNAPSHOT_VERSION}")
+    return state
+
+
+class SnapshotWriter:
+    """Writes snapshots to disk on a background thread.
+
+    submit() captures the state and returns right away. If the writer is
+    still busy with an older snapshot of the same path, the pending one is
+    replaced, as only the latest snapshot matters.
+    """
+
+    def __init__(self):
+        self.pending = {}  # path -> bytes waiting to be written
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, path, state):
+        data = capture(state)
+        with self.condition:
+            self.pending[path] = data
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                path, data = self.pending.popitem()
+            write_atomic(path, data)
+
+    def close(self):
+        """Write the pending snapshots and stop the thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,80 @@
+import math
+
+
+class SpatialIndex:
+    """Per-type bucket grid for nearest-entity queries.
+
+    The map is split into square buckets of bucket_size cells, and every
+    entity position is stored in the bucket set for its type. A nearest query
+    only visits the buckets that overlap the search radius, closest bucket
+    first, and stops once no remaining bucket can hold anything closer, so
+    its cost follows the number of nearby entities rather than the window
+    area. The owner keeps it current by calling set() whenever a cell changes.
+    """
+
+    def __init__(self, bucket_size=4):
+        self.bucket_size = bucket_size
+        self.buckets = {}  # (entity_type, bucket_x, bucket_y) -> set of (x, y)
+        self.types = {}  # (x, y) -> entity_type
+        self.counts = {}  # entity_type -> number of positions
+        self.rounded = []  # squared distance -> rounded distance
+
+    def set(self, x, y, entity_type):
+        """Record what is visible at (x, y), None for nothing"""
+        old_type = self.types.get((x, y))
+        if old_type == entity_type:
+            return
+        size = self.bucket_size
+        if old_type is not None:
+            self.buckets[(old_type, x // size, y // size)].discard((x, y))
+            self.counts[old_type] -= 1
+        if entity_type is None:
+            del self.types[(x, y)]
+        else:
+            self.types[(x, y)] = entity_type
+            self.buckets.setdefault((entity_type, x // size, y // size), set()).add((x, y))
+            self.counts[entity_type] = self.counts.get(entity_type, 0) + 1
+
+    def count(self, entity_type):
+        return self.counts.get(entity_type, 0)
+
+    def rounded_distance(self, squared):
+        """round(sqrt(squared)) from a lookup table"""
+        while squared >= len(self.rounded):
+            self.rounded.append(round(math.sqrt(len(self.rounded))))
+        return self.rounded[squared]
+
+    def nearest(self, x, y, entity_type, radius):
+        """Closest entity of a type within a rounded euclidean radius, or None.
+
+        The cell (x, y) itself is never returned. Ties are broken the way a
+        row-major window scan would: smallest dy first, then smallest dx.
+        """
+        size = self.bucket_size
+        candidates = []
+        for bucket_y in range((y - radius) // size, (y + radius) // size + 1):
+            gap_y = max(bucket_y * size - y, 0, y - (bucket_y * size + size - 1))
+            for bucket_x in range((x - radius) // size, (x + radius) // size + 1):
+                bucket = self.buckets.get((entity_type, bucket_x, bucket_y))
+                if bucket:
+                    gap_x = max(bucket_x * size - x, 0, x - (bucket_x * size + size - 1))
+                    candidates.append((gap_x * gap_x + gap_y * gap_y, bucket_y, bucket_x, bucket))
+        candidates.sort()
+
+        best = None
+        for gap, _, _, bucket in candidates:
+            if best is not None and self.rounded_distance(gap) > best[0]:
+                break
+            for target_x, target_y in bucket:
+                dx, dy = target_x - x, target_y - y
+                if dx == 0 and dy == 0:
+                    continue
+                distance = self.rounded_distance(dx * dx + dy * dy)
+                if distance > radius:
+                    continue
+                key = (distance, dy, dx)
+                if best is None or key < best:
+                    best = key
+        if best is None:
+            return None
+        return x + best[2], y + best[1]
@@ -0,0 +1,43 @@
+import math
+
+_STENCILS = {}
+_RINGS = {}
+
+
+def vision_stencil(radius):
+    """Offsets within a rounded euclidean radius, nearest first.
+
+    Returns a tuple of (distance, dx, dy, before_center) built once per
+    radius. Entries are sorted by distance and then in row-major scan order,
+    so a query that walks the stencil can stop at its first hit and still
+    break ties the way a window scan would. before_center marks offsets that
+    a row-major scan visits before the center cell. The center itself is
+    left out.
+    """
+    if radius not in _STENCILS:
+        entries = []
+        for dy in range(-radius, radius + 1):
+            for dx in range(-radius, radius + 1):
+                distance = round(math.sqrt(dx * dx + dy * dy))
+                if 0 < distance <= radius:
+                    before_center = dy < 0 or (dy == 0 and dx < 0)
+                    entries.append((distance, dy, dx, before_center))
+        entries.sort()
+        _STENCILS[radius] = tuple((distance, dx, dy, before_center)
+                                  for distance, dy, dx, before_center in entries)
+    return _STENCILS[radius]
+
+
+def distance_rings(radius):
+    """The vision stencil grouped by distance.
+
+    Returns a tuple of (distance, offsets) where offsets is a tuple of
+    (dx, dy, before_center), for vision implementations that process a whole
+    ring of equally distant cells at once.
+    """
+    if radius not in _RINGS:
+        rings = {}
+        for distance, dx, dy, before_center in vision_stencil(radius):
+            rings.setdefault(distance, []).append((dx, dy, before_center))
+        _RINGS[radius] = tuple((distance, tuple(offsets)) for distance, offsets in sorted(rings.items()))
+    return _RINGS[radius]
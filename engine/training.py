@@ -0,0 +1,216 @@
+import os
+import random
+import contextlib
+import multiprocessing
+
+from config import (
+    ANIMAL_TYPES, GRID_WIDTH, GRID_HEIGHT, NUMBER_OF_SIMULATIONS, TOP_PERFORMERS_TO_KEEP, TRAINING_GENERATIONS
+)
+from engine.ensemble import run_ensemble
+from engine.genome import MUTATION_CHANCE, RANDOM_CHOICES, as_genome, mutated
+from engine.metrics import StepMetrics, describe, describe_vision_cache, merge_summaries
+from engine.simulation import run_simulation, save_simulation_results
+from engine.snapshot import SnapshotWriter, load_snapshot
+
+
+def breed_genes(best_performer_genes, animal_type, count=TOP_PERFORMERS_TO_KEEP):
+    """Build the gene pool for the next simulation from the best performers' genes"""
+    next_generation_genes = []
+    # For each new gene set we need
+    for _ in range(count):
+        # Take a random one of the best performers' genes, shared until a
+        # mutation changes it
+        base_genes = as_genome(animal_type, random.choice(best_performer_genes))
+
+        # 25% chance for mutation
+        if random.random() < MUTATION_CHANCE:
+            # Mutate 10% of the genes, each to an action that fits its key
+            base_genes = mutated(base_genes, RANDOM_CHOICES[animal_type])
+
+        next_generation_genes.append(base_genes)
+    return next_generation_genes
+
+
+def ga_state(best_genes, generation, simulation=0, seed=None):
+    """The evolution state after a finished generation or simulation, for engine.snapshot"""
+    return {
+        'kind': 'ga',
+        'best_genes': best_genes,
+        'generation': generation,
+        'simulation': simulation,
+        'seed': seed,
+        'random_state': random.getstate()
+    }
+
+
+def restore_ga_state(state):
+    """Restore the random state of a GA snapshot and return its best genes"""
+    random.setstate(state['random_state'])
+    return state['best_genes']
+
+
+def simulation_seed(base_seed, generation, simulation):
+    """Seed of one simulation of a run, see engine.rng.BatchedRandom"""
+    return (base_seed, generation, simulation)
+
+
+def run_simulation_task(task, renderer=None, generation=0):
+    """Run one headless simulation in a worker and return compact results
+
+    Only the survival times, the genes of the top performers and the phase
+    metrics summary are sent back to the parent process, not the Animal
+    objects.
+    """
+    initial_genes, seed, backend, quiet, width, height = task
+    metrics = StepMetrics()
+    if quiet:
+        # Status lines would interleave across workers
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = run_simulation(initial_genes=initial_genes, renderer=renderer, generation=generation,
+                                     backend=backend, seed=seed, metrics=metrics, width=width, height=height)
+    else:
+        results = run_simulation(initial_genes=initial_genes, renderer=renderer, generation=generation,
+                                 backend=backend, seed=seed, metrics=metrics, width=width, height=height)
+
+    return compact_results(results, metrics.summary())
+
+
+def compact_results(results, summary):
+    """The survival times and top performers' genes per animal type of one
+    simulation's results, with its metrics summary"""
+    compact = {'metrics': summary}
+    for animal_type in ANIMAL_TYPES:
+        type_results = [(animal, survival_time) for animal, survival_time in results
+                        if animal.animal_type == animal_type]
+        type_results.sort(key=lambda x: x[1], reverse=True)
+        compact[animal_type] = {
+            'survival_times': [survival_time for _, survival_time in type_results],
+            'top': [(animal.genes, survival_time)
+                    for animal, survival_time in type_results[:TOP_PERFORMERS_TO_KEEP]]
+        }
+    return compact
+
+
+def run_ensemble_generation(best_genes, generation, simulations, base_seed, width=GRID_WIDTH,
+                            height=GRID_HEIGHT):
+    """Run the simulations of one generation in this process as one
+    engine.ensemble.Ensemble
+
+    The metrics of the whole ensemble go with the first result, as its
+    steps advance all simulations at once.
+    """
+    metrics = StepMetrics()
+    worlds = run_ensemble(simulations, best_genes, seed=(base_seed, generation), metrics=metrics,
+                          width=width, height=height)
+    summaries = [metrics.summary()] + [StepMetrics().summary()] * (len(worlds) - 1)
+    return [compact_results(results, summary) for results, summary in zip(worlds, summaries)]
+
+
+def run_generation(pool, best_genes, generation, simulations, base_seed, backend='grid', quiet=True,
+                   capture=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Fan out the simulations of one generation, each on a width by height
+    map, to a worker pool
+
+    With a capture (see graphics.capture.FrameCapture) the first simulation
+    is recorded. It runs in this process, as pool workers cannot start the
+    capture's renderer process, while the pool runs the others.
+
+    The 'ensemble' backend runs them all in this process instead, see
+    run_ensemble_generation, and needs no pool. It can't be recorded.
+    """
+    if backend == 'ensemble':
+        if capture is not None:
+            raise ValueError("The ensemble backend can't be recorded")
+        return run_ensemble_generation(best_genes, generation, simulations, base_seed, width, height)
+    tasks = [(best_genes, simulation_seed(base_seed, generation, simulation), backend, quiet, width, height)
+             for simulation in range(simulations)]
+    if capture is None or not tasks:
+        return pool.map(run_simulation_task, tasks)
+    pending = pool.map_async(run_simulation_task, tasks[1:])
+    recorded = run_simulation_task(tasks[0], renderer=capture, generation=generation)
+    return [recorded] + pending.get()
+
+
+def merge_results(results):
+    """Combine the compact results of many simulations per animal type
+
+    Returns a dict of animal_type -> list of (genes, survival_time) pairs,
+    best first. Genes are only kept for the top performers of each
+    simulation, the other entries carry None.
+    """
+    type_results_dict = {}
+    for animal_type in ANIMAL_TYPES:
+        type_results = []
+        for result in results:
+            top = result[animal_type]['top']
+            type_results.extend(top)
+            type_results.extend((None, survival_time)
+                                for survival_time in result[animal_type]['survival_times'][len(top):])
+        type_results.sort(key=lambda x: x[1], reverse=True)
+        type_results_dict[animal_type] = type_results
+    return type_results_dict
+
+
+def train(generations=TRAINING_GENERATIONS, simulations=NUMBER_OF_SIMULATIONS, processes=None,
+          seed=0, backend='grid', checkpoint=None, capture=None, verbose=False,
+          width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Evolve the gene pools over several generations using a process pool
+    (or one engine.ensemble.Ensemble per generation with backend 'ensemble')
+
+    Every generation runs `simulations` independent headless simulations on
+    width by height maps in parallel, each with its own seed derived from
+    `seed`, then breeds the next gene pool from the best performers across
+    all of them.
+
+    With a checkpoint path the GA state is saved there after every
+    generation, and a run started with an existing checkpoint continues
+    after its last finished generation with the same results as an
+    uninterrupted run.
+
+    A capture records the first simulation of every generation, see
+    run_generation. verbose also prints the vision cache counters of every
+    generation.
+    """
+    random.seed(seed)
+    best_genes = {animal_type: [] for animal_type in ANIMAL_TYPES}
+    first_generation = 0
+
+    state = load_snapshot(checkpoint) if checkpoint else None
+    if state:
+        if state['seed'] != seed:
+            raise ValueError(f"{checkpoint} was trained with seed {state['seed']}, not {seed}")
+        best_genes = restore_ga_state(state)
+        first_generation = state['generation'] + 1
+        print(f"Resuming from {checkpoint} at generation {first_generation}")
+    snapshots = SnapshotWriter() if checkpoint else None
+
+    # The ensemble backend runs every generation in this process
+    with multiprocessing.Pool(processes) if backend != 'ensemble' else contextlib.nullcontext() as pool:
+        for generation in range(first_generation, generations):
+            results = run_generation(pool, best_genes if generation > 0 else None,
+                                     generation, simulations, seed, backend, capture=capture,
+                                     width=width, height=height)
+            type_results_dict = merge_results(results)
+
+            for animal_type, type_results in type_results_dict.items():
+                if not type_results:
+                    continue
+                best_performers = type_results[:TOP_PERFORMERS_TO_KEEP]
+                best_genes[animal_type] = breed_genes([genes for genes, _ in best_performers], animal_type)
+
+                survival_times = [survival for _, survival in type_results]
+                print(f"Generation {generation} - {animal_type}: "
+                      f"avg survival {sum(survival_times) / len(survival_times):.2f}, "
+                      f"best {survival_times[0]}, animals {len(survival_times)}")
+
+            metrics = merge_summaries([result['metrics'] for result in results])
+            print(f"Generation {generation} - {describe(metrics)}")
+            if verbose and describe_vision_cache(metrics):
+                print(f"Generation {generation} - {describe_vision_cache(metrics)}")
+            save_simulation_results(generation, type_results_dict, best_genes, metrics)
+            if snapshots:
+                snapshots.submit(checkpoint, ga_state(best_genes, generation, seed=seed))
+
+    if snapshots:
+        snapshots.close()
+    return best_genes
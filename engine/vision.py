@@ -0,0 +1,92 @@
+import numpy as np
+
+from config import ANIMAL_TYPES
+from engine import stencils
+
+# Columns of a vision key, in the order Animal.get_vision_key packs them
+KEY_TYPES = ('plant', 'herbivore', 'omnivore', 'carnivore')
+
+# Content codes used while scanning: 0 empty, 1..3 the ArrayGrid animal codes
+# (ANIMAL_TYPES order) and PLANT_CODE for a plant that no animal stands on
+PLANT_CODE = len(ANIMAL_TYPES) + 1
+OUTSIDE = -1
+KEY_COLUMN = np.full(PLANT_CODE + 1, -1, dtype=np.int8)
+KEY_COLUMN[PLANT_CODE] = KEY_TYPES.index('plant')
+for _code, _animal_type in enumerate(ANIMAL_TYPES, start=1):
+    KEY_COLUMN[_code] = KEY_TYPES.index(_animal_type)
+# KEY_COLUMN as bit flags, indexed by content code + 1 so OUTSIDE maps to 0
+KEY_BIT = np.zeros(PLANT_CODE + 2, dtype=np.uint8)
+KEY_BIT[1:] = np.where(KEY_COLUMN >= 0, 1 << KEY_COLUMN.clip(0), 0)
+ALL_KEY_BITS = (1 << len(KEY_TYPES)) - 1
+
+_RINGS = {}
+
+
+def distance_rings(radius):
+    """The distance rings of engine.stencils as arrays, nearest first.
+
+    Returns a list of (distance, dx, dy, before_center) where the last three
+    are arrays, so a whole ring can be gathered with one fancy index.
+    """
+    if radius not in _RINGS:
+        _RINGS[radius] = [
+            (distance,
+             np.array([dx for dx, _, _ in offsets]),
+             np.array([dy for _, dy, _ in offsets]),
+             np.array([before_center for _, _, before_center in offsets]))
+            for distance, offsets in stencils.distance_rings(radius)
+        ]
+    return _RINGS[radius]
+
+
+def content_layer(plant_layer, kind_layer, padding):
+    """Merge plants and animals into one code layer with an OUTSIDE border"""
+    content = np.where((kind_layer == 0) & plant_layer, PLANT_CODE, kind_layer).astype(np.int8)
+    return np.pad(content, padding, constant_values=OUTSIDE)
+
+
+def batch_vision(plant_layer, kind_layer, xs, ys, kinds, radii):
+    """Compute the vision of many animals in one vectorized pass.
+
+    Instead of scanning a window per animal, this walks the distance rings of
+    the largest radius once and gathers the cells at that offset for every
+    animal at the same time. The first ring in which a type shows up is its
+    closest distance. Animals drop out of the walk once they have seen every
+    type or reached the end of their own radius, and it stops when none are
+    left.
+
+    xs, ys, kinds and radii are equally long arrays describing the animals.
+    Returns an (N, 4) int16 array of closest distances in KEY_TYPES order,
+    with 0 meaning "not seen", i.e. one vision key per row. The animal's own
+    type follows the same scan-order rule as Grid.get_vision.
+    """
+    count = len(xs)
+    keys = np.zeros((count, len(KEY_TYPES)), dtype=np.int16)
+    if count == 0:
+        return keys
+
+    max_radius = int(radii.max())
+    # One bit per key column, so a ring is merged with a single OR per animal
+    bits = KEY_BIT[content_layer(plant_layer, kind_layer, max_radius) + 1]
+    own = KEY_BIT[kinds + 1]
+    found = np.zeros(count, dtype=np.uint8)
+    # Animals still looking: not every type seen and the radius not reached
+    active = np.arange(count)
+
+    for distance, dx, dy, before_center in distance_rings(max_radius):
+        cells = bits[ys[active, None] + (dy + max_radius), xs[active, None] + (dx + max_radius)]
+        # Same-type animals scanned before the own cell do not count
+        cells[:, before_center] &= ~own[active, None]
+        seen = np.bitwise_or.reduce(cells, axis=1) & ~found[active]
+        found[active] |= seen
+        for column in range(len(KEY_TYPES)):
+            keys[active[(seen & (1 << column)) != 0], column] = distance
+        active = active[(found[active] != ALL_KEY_BITS) & (radii[active] > distance)]
+        if not len(active):
+            break
+    return keys
+
+
+def key_tuples(keys):
+    """Turn an array of vision keys into the tuples Animal.genes is keyed by"""
+    return list(map(tuple, keys.tolist()))
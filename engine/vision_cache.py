@@ -0,0 +1,61 @@
+class VisionCache:
+    """Remembers get_vision results per (cell, animal type) between grid mutations.
+
+    Grid.get_vision is a pure function of the cells around (x, y), so a result
+    stays valid until something changes within the viewer's vision radius.
+    Every mutation calls invalidate(x, y), which drops the entries whose
+    window contains that cell.
+    """
+
+    def __init__(self, radii):
+        self.radii = dict(radii)  # animal_type -> vision radius
+        self.max_radius = max(self.radii.values())
+        self.window_area = (2 * self.max_radius + 1) ** 2
+        self.entries = {}  # (x, y, animal_type) -> vision
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, x, y, animal_type):
+        vision = self.entries.get((x, y, animal_type))
+        if vision is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vision
+
+    def put(self, x, y, animal_type, vision):
+        self.entries[(x, y, animal_type)] = vision
+
+    def invalidate(self, x, y):
+        """Forget every entry that can see (x, y)"""
+        if not self.entries:
+            return
+        self.invalidations += 1
+        radii = self.radii
+        # Walk whichever is smaller: the cached entries or the affected window
+        if len(self.entries) < self.window_area:
+            stale = [key for key in self.entries
+                     if abs(key[0] - x) <= radii[key[2]] and abs(key[1] - y) <= radii[key[2]]]
+            for key in stale:
+                del self.entries[key]
+        else:
+            for animal_type, radius in radii.items():
+                for dy in range(-radius, radius + 1):
+                    for dx in range(-radius, radius + 1):
+                        self.entries.pop((x + dx, y + dy, animal_type), None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hit_rate()
+        }
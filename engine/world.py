@@ -0,0 +1,602 @@
+import numpy as np
+
+from config import ANIMAL_TYPES, PLANT_TYPE, VISION_RADIUS, HUNGER_DEATH, AGE_DEATH, REPRODUCTION_COOLDOWNS
+from engine.animal import Action, generate_random_genes, mix_genes
+from engine.events import EventLog
+from engine.genome import GenomeTable, as_genome
+from engine.ledger import Ledger
+from engine.grid import DIRECTION_ORDERS, Grid
+from engine.metrics import StepMetrics
+from engine.rng import BatchedRandom
+from engine.stencils import vision_stencil
+from engine.vision import KEY_TYPES, batch_vision, key_tuples
+
+# Type codes used in the kind layer and the per-animal kind column. 0 means empty.
+ANIMAL_CODES = {animal_type: code for code, animal_type in enumerate(ANIMAL_TYPES, start=1)}
+ANIMAL_NAMES = [None] + list(ANIMAL_TYPES)
+HERBIVORE = ANIMAL_CODES['herbivore']
+CARNIVORE = ANIMAL_CODES['carnivore']
+OMNIVORE = ANIMAL_CODES['omnivore']
+
+# Per-code limits so the aging/death pass can look them up with one fancy index
+HUNGER_LIMIT = np.array([0] + [HUNGER_DEATH[t] for t in ANIMAL_TYPES], dtype=np.int16)
+AGE_LIMIT = np.array([0] + [AGE_DEATH[t] for t in ANIMAL_TYPES], dtype=np.int16)
+VISION_RADII = np.array([0] + [VISION_RADIUS[t] for t in ANIMAL_TYPES], dtype=np.int16)
+OWN_KEY_COLUMN = [None] + [KEY_TYPES.index(t) for t in ANIMAL_TYPES]
+
+NEIGHBOR_OFFSETS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+NEIGHBOR_DX = np.array([dx for dx, _ in NEIGHBOR_OFFSETS])
+NEIGHBOR_DY = np.array([dy for _, dy in NEIGHBOR_OFFSETS])
+ACTION_TARGETS = {
+    Action.MOVE_TO_PLANT: PLANT_TYPE,
+    Action.MOVE_TO_HERBIVORE: 'herbivore',
+    Action.MOVE_TO_OMNIVORE: 'omnivore',
+    Action.MOVE_TO_CARNIVORE: 'carnivore',
+    Action.FLEE_FROM_HERBIVORE: 'herbivore',
+    Action.FLEE_FROM_OMNIVORE: 'omnivore',
+    Action.FLEE_FROM_CARNIVORE: 'carnivore',
+}
+FLEE_ACTIONS = {Action.FLEE_FROM_HERBIVORE, Action.FLEE_FROM_OMNIVORE, Action.FLEE_FROM_CARNIVORE}
+NO_DISTANCE = np.iinfo(np.int16).max
+
+
+def vision_table(radius):
+    """Distances of a (2r+1)x(2r+1) window built from the vision stencil, with
+    out-of-range offsets and the center cell masked out"""
+    table = np.full((2 * radius + 1, 2 * radius + 1), NO_DISTANCE, dtype=np.int16)
+    for distance, dx, dy, _ in vision_stencil(radius):
+        table[dy + radius, dx + radius] = distance
+    return table
+
+
+def own_vision_table(radius):
+    """Distance table for the animal's own type.
+
+    Grid.get_vision resets the own-type distance to 0 when its scan reaches
+    the animal's own cell, so only same-type animals after that cell in
+    row-major order count. Masking the first half of the window keeps the gene
+    keys of both backends identical.
+    """
+    table = vision_table(radius)
+    table.flat[:table.size // 2 + 1] = NO_DISTANCE
+    return table
+
+
+VISION_TABLES = {radius: vision_table(radius) for radius in set(VISION_RADIUS.values())}
+OWN_VISION_TABLES = {radius: own_vision_table(radius) for radius in set(VISION_RADIUS.values())}
+
+
+def _column(name):
+    def fget(self):
+        return getattr(self.world, name)[self.slot].item()
+
+    def fset(self, value):
+        getattr(self.world, name)[self.slot] = value
+
+    return property(fget, fset)
+
+
+class AnimalView:
+    """Animal-like handle onto one row of an ArrayGrid's animal columns.
+
+    Lets run_simulation and the training loop treat array-backed animals the
+    same way as engine.animal.Animal objects.
+    """
+
+    x = _column('xs')
+    y = _column('ys')
+    hunger = _column('hunger')
+    age = _column('age')
+    reproduction_cooldown = _column('cooldown')
+    stationary_count = _column('stationary')
+    offspring_count = _column('offspring')
+
+    def __init__(self, world, slot):
+        self.world = world
+        self.slot = slot
+
+    @property
+    def animal_type(self):
+        return ANIMAL_NAMES[self.world.kind[self.slot]]
+
+    @property
+    def genes(self):
+        return self.world.genomes[self.world.genome[self.slot]]
+
+    @property
+    def alive(self):
+        return bool(self.world.alive[self.slot])
+
+
+class ArrayGrid(Grid):
+    """Grid backend that keeps the world in typed NumPy arrays.
+
+    The map is stored as layers (plant_layer, kind_layer and animal_layer,
+    which holds the slot of the animal in each cell or -1) and every animal is
+    a row in a set of parallel columns: xs, ys, kind, hunger, age, cooldown,
+    stationary, genome, alive, offspring and lifetime (the row in the grid's
+    engine.ledger.Ledger, -1 for none). Once dead animals hold most of the
+    slots, compact() packs the living ones to the front and drops the
+    genomes only the dead used, so an AnimalView is only valid until the
+    next update_animals.
+
+    Aging, plant grazing on the animal's own cell and the death pass run as
+    whole-array operations. The remaining phases follow Grid.update_animals.
+
+    With batched_vision=True the reproduction and movement phases take one
+    vision snapshot for all animals at the start of the phase (see
+    engine.vision.batch_vision) instead of scanning per animal. Animals then
+    react to the world as it was when the phase began rather than to moves
+    made earlier in the same phase.
+    """
+
+    COLUMNS = ('xs', 'ys', 'kind', 'hunger', 'age', 'cooldown', 'stationary',
+               'genome', 'alive', 'offspring', 'lifetime')
+
+    def __init__(self, width, height, capacity=512, batched_vision=False, events=None, seed=None):
+        self.width = width
+        self.height = height
+        self.batched_vision = batched_vision
+        self.plant_layer = np.zeros((height, width), dtype=bool)
+        self.kind_layer = np.zeros((height, width), dtype=np.int8)
+        self.animal_layer = np.full((height, width), -1, dtype=np.int32)
+
+        self.count = 0  # Number of slots in use, dead ones until compact()
+        self.xs = np.zeros(capacity, dtype=np.int32)
+        self.ys = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.hunger = np.zeros(capacity, dtype=np.int16)
+        self.age = np.zeros(capacity, dtype=np.int16)
+        self.cooldown = np.zeros(capacity, dtype=np.int16)
+        self.stationary = np.zeros(capacity, dtype=np.int16)
+        self.genome = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.offspring = np.zeros(capacity, dtype=np.int32)
+        self.lifetime = np.zeros(capacity, dtype=np.int32)
+
+        # Genome id -> Genome, shared by every animal with the same genes
+        self.genomes = GenomeTable()
+        self.vision_cache = None
+        self.events = events if events is not None else EventLog()
+        self.metrics = StepMetrics(enabled=False)
+        self.ledger = Ledger()
+        self.rng = BatchedRandom(seed)
+
+    def __getstate__(self):
+        """Snapshots leave out the event log and the metrics"""
+        state = self.__dict__.copy()
+        state['events'] = None
+        state['metrics'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.events = EventLog()
+        self.metrics = StepMetrics(enabled=False)
+
+    def _grow(self):
+        """Double the capacity of every animal column"""
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    @property
+    def plants(self):
+        ys, xs = np.nonzero(self.plant_layer)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    def positions_of(self, animal_type):
+        slots = self.living_slots(ANIMAL_CODES[animal_type])
+        return set(zip(self.xs[slots].tolist(), self.ys[slots].tolist()))
+
+    @property
+    def herbivores(self):
+        return self.positions_of('herbivore')
+
+    @property
+    def carnivores(self):
+        return self.positions_of('carnivore')
+
+    @property
+    def omnivores(self):
+        return self.positions_of('omnivore')
+
+    def living_slots(self, code=None):
+        alive = self.alive[:self.count]
+        if code is not None:
+            alive = alive & (self.kind[:self.count] == code)
+        return np.flatnonzero(alive)
+
+    def animal_count(self):
+        return int(np.count_nonzero(self.alive[:self.count]))
+
+    def animal_at(self, x, y):
+        slot = self.animal_layer[y, x]
+        return AnimalView(self, int(slot)) if slot >= 0 else None
+
+    def is_empty(self, x, y):
+        """Check if position is valid and has no animals (plants are ok)"""
+        return self.is_valid_position(x, y) and self.animal_layer[y, x] < 0
+
+    def is_empty_for_plant(self, x, y):
+        """Check if position is valid and has no plant (animals are ok)"""
+        # As in Grid, a plant hidden under an animal does not block the cell
+        return self.is_valid_position(x, y) and (self.kind_layer[y, x] != 0 or not self.plant_layer[y, x])
+
+    def has_animal(self, x, y):
+        """Check if position has an animal"""
+        return self.is_valid_position(x, y) and self.animal_layer[y, x] >= 0
+
+    def add_plant(self, x, y):
+        if self.is_empty_for_plant(x, y):
+            self.plant_layer[y, x] = True
+            return True
+        return False
+
+    def add_animal(self, x, y, animal_type, is_offspring=False, genes=None):
+        if not self.is_empty(x, y):
+            return False
+        genes = as_genome(animal_type, genes) if genes else generate_random_genes(animal_type, self.rng.generator)
+        slot = self._place(x, y, ANIMAL_CODES[animal_type], self.genomes.intern(genes), is_offspring)
+        self.lifetime[slot] = self.ledger.birth(animal_type, genes)
+        return True
+
+    def _place(self, x, y, code, genome_id, is_offspring):
+        if self.count == len(self.alive):
+            self._grow()
+        slot = self.count
+        self.count += 1
+        self.xs[slot] = x
+        self.ys[slot] = y
+        self.kind[slot] = code
+        self.genome[slot] = genome_id
+        self.lifetime[slot] = -1
+        self.cooldown[slot] = REPRODUCTION_COOLDOWNS[ANIMAL_NAMES[code]] if is_offspring else 0
+        self.alive[slot] = True
+        self.animal_layer[y, x] = slot
+        self.kind_layer[y, x] = code
+        return slot
+
+    def compact(self):
+        """Pack the living animals into the first slots and drop the genomes
+        of dead ones, once the dead hold most of the slots
+
+        The ledger keeps the genes of every animal it reports on, so the
+        columns and the genome table only need the living. Slots keep their
+        order, which keeps every iteration over them the same.
+        """
+        living = self.living_slots()
+        count = len(living)
+        if self.count < 2 * count + 256:
+            return
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:count] = column[living]
+            column[count:self.count] = 0
+        self.count = count
+        self.animal_layer[self.ys[:count], self.xs[:count]] = np.arange(count)
+        used, self.genome[:count] = np.unique(self.genome[:count], return_inverse=True)
+        self.genomes = GenomeTable(self.genomes[genome] for genome in used.tolist())
+
+    def _remove(self, slot):
+        x, y = self.xs[slot], self.ys[slot]
+        self.alive[slot] = False
+        self.animal_layer[y, x] = -1
+        self.kind_layer[y, x] = 0
+
+    def get_empty_neighbors(self, x, y):
+        return [(x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS
+                if self.is_empty_for_plant(x + dx, y + dy)]
+
+    def update_plants(self):
+        """Every plant with a free neighbor spreads to one of them at random"""
+        ys, xs = self.plant_spread()
+        self.plant_layer[ys, xs] = True
+
+    def plant_spread(self, rows=None):
+        """Cells the plants spread to this step, as arrays of ys and xs
+
+        Runs on shifted copies of the layers instead of visiting plants: for
+        each neighbor direction a mask tells which cells have that neighbor
+        free, which gives the plants that can spread and how many choices
+        each has in a few whole-array operations. With rows=(start, stop)
+        only the plants in those rows spread.
+        """
+        height, width = self.plant_layer.shape
+        # Free for a plant: no plant, or one hidden under an animal as in Grid
+        free = np.zeros((height + 2, width + 2), dtype=bool)
+        free[1:-1, 1:-1] = (self.kind_layer != 0) | ~self.plant_layer
+        free_neighbors = np.stack([free[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+                                   for dx, dy in NEIGHBOR_OFFSETS])
+        counts = free_neighbors.sum(axis=0)
+
+        frontier = self.plant_layer & (counts > 0)
+        if rows is not None:
+            frontier[:rows[0]] = False
+            frontier[rows[1]:] = False
+        ys, xs = np.nonzero(frontier)
+        if len(xs) == 0:
+            return ys, xs
+        # Pick the k-th free neighbor of every frontier plant, in NEIGHBOR_OFFSETS order
+        picks = (self.rng.generator.random(len(xs)) * counts[ys, xs]).astype(np.int64)
+        seen = free_neighbors[:, ys, xs].cumsum(axis=0)
+        directions = (seen <= picks).sum(axis=0)
+        return ys + NEIGHBOR_DY[directions], xs + NEIGHBOR_DX[directions]
+
+    def _window(self, x, y, radius):
+        """Clipped window around (x, y) and the matching slice of a distance table"""
+        y0, y1 = max(0, y - radius), min(self.height, y + radius + 1)
+        x0, x1 = max(0, x - radius), min(self.width, x + radius + 1)
+        cells = (slice(y0, y1), slice(x0, x1))
+        table = (slice(y0 - y + radius, y1 - y + radius), slice(x0 - x + radius, x1 - x + radius))
+        return cells, table
+
+    def get_vision(self, x, y, animal_type):
+        """Return closest distances to each type within vision radius"""
+        radius = VISION_RADIUS[animal_type]
+        cells, table = self._window(x, y, radius)
+        distances = VISION_TABLES[radius][table]
+        own_distances = OWN_VISION_TABLES[radius][table]
+        kinds = self.kind_layer[cells]
+
+        vision = {}
+        # A plant with an animal on top of it is hidden, same as in Grid
+        visible = {PLANT_TYPE: self.plant_layer[cells] & (kinds == 0)}
+        for code in (HERBIVORE, OMNIVORE, CARNIVORE):
+            visible[ANIMAL_NAMES[code]] = kinds == code
+        for name, mask in visible.items():
+            table = own_distances if name == animal_type else distances
+            closest = table[mask].min(initial=NO_DISTANCE)
+            vision[name] = 0 if closest == NO_DISTANCE else int(closest)
+        return vision
+
+    def get_vision_key(self, x, y, animal_type):
+        """Vision of one animal packed as a gene key"""
+        vision = self.get_vision(x, y, animal_type)
+        return tuple(vision[name] for name in KEY_TYPES)
+
+    def batch_vision(self, slots):
+        """Vision keys of many animals at once, one row per slot"""
+        kinds = self.kind[slots]
+        return batch_vision(self.plant_layer, self.kind_layer, self.xs[slots], self.ys[slots],
+                            kinds, VISION_RADII[kinds])
+
+    def vision_snapshot(self, cells):
+        """Map the slot of every animal on the given cells to its vision key,
+        or return None when vision is computed per animal"""
+        if not self.batched_vision:
+            return None
+        slots = np.array([self.animal_layer[y, x] for x, y in cells], dtype=np.int32)
+        slots = slots[slots >= 0]
+        return dict(zip(slots.tolist(), key_tuples(self.batch_vision(slots))))
+
+    def random_move(self, x, y):
+        """Make a random move"""
+        for dx, dy in self.rng.choice(DIRECTION_ORDERS):
+            if self.is_empty(x + dx, y + dy):
+                return x + dx, y + dy
+
+        return x, y  # Stay in place if no valid move
+
+    def find_closest_of_type(self, x, y, vision_dict, target_type):
+        """Find the closest entity of target_type within the searcher's vision radius"""
+        code = self.kind_layer[y, x]
+        radius = VISION_RADIUS[ANIMAL_NAMES[code]] if code else max(VISION_RADIUS.values())
+        cells, table = self._window(x, y, radius)
+        kinds = self.kind_layer[cells]
+        if target_type == PLANT_TYPE:
+            mask = self.plant_layer[cells] & (kinds == 0)
+        else:
+            mask = kinds == ANIMAL_CODES[target_type]
+        distances = np.where(mask, VISION_TABLES[radius][table], NO_DISTANCE)
+        # argmin picks the first minimum in row-major order, the same tie
+        # break Grid's spatial index uses
+        index = np.argmin(distances)
+        if distances.flat[index] == NO_DISTANCE:
+            return None
+        row, col = np.unravel_index(index, distances.shape)
+        return cells[1].start + int(col), cells[0].start + int(row)
+
+    def apply_move(self, x, y, new_x, new_y, animal_type):
+        """Move animal to new position if possible"""
+        if not self.is_valid_position(new_x, new_y) or self.animal_layer[new_y, new_x] >= 0:
+            return False
+
+        slot = self.animal_layer[y, x]
+        code = self.kind[slot]
+        # Herbivores and omnivores eat the plant they step on
+        if code != CARNIVORE and self.plant_layer[new_y, new_x]:
+            self.plant_layer[new_y, new_x] = False
+            self.hunger[slot] = 0
+            if self.events.feeding:
+                self.events.emit('feeding', animal_type, new_x, new_y)
+
+        self.animal_layer[y, x] = -1
+        self.kind_layer[y, x] = 0
+        self.animal_layer[new_y, new_x] = slot
+        self.kind_layer[new_y, new_x] = code
+        self.xs[slot] = new_x
+        self.ys[slot] = new_y
+        return True
+
+    def find_parent_nearby(self, x, y, animal_type):
+        """Find the slot of a potential parent of the same type at distance 1"""
+        code = ANIMAL_CODES[animal_type]
+        for dx, dy in NEIGHBOR_OFFSETS:
+            new_x, new_y = x + dx, y + dy
+            if self.is_valid_position(new_x, new_y) and self.kind_layer[new_y, new_x] == code:
+                return int(self.animal_layer[new_y, new_x])
+        return None
+
+    def create_offspring(self, x, y, parent1, parent2, animal_type):
+        """Place a new animal with mixed genes from the parent slots, return its slot"""
+        genes = mix_genes(animal_type, self.genomes[self.genome[parent1]], self.genomes[self.genome[parent2]],
+                          self.rng.generator)
+        slot = self._place(x, y, ANIMAL_CODES[animal_type], self.genomes.intern(genes), is_offspring=True)
+        self.lifetime[slot] = self.ledger.birth(animal_type, genes)
+        return slot
+
+    def age_and_cull(self):
+        """Age every living animal, let grazers eat the plant under them and
+        remove animals that died of hunger or old age, all as array operations.
+
+        Returns the slots that were alive before the death pass.
+        """
+        slots = self.living_slots()
+        self.hunger[slots] += 1
+        self.age[slots] += 1
+
+        xs, ys, kinds = self.xs[slots], self.ys[slots], self.kind[slots]
+        grazing = (kinds != CARNIVORE) & self.plant_layer[ys, xs]
+        self.plant_layer[ys[grazing], xs[grazing]] = False
+        self.hunger[slots[grazing]] = 0
+        if self.events.feeding:
+            for x, y, code in zip(xs[grazing].tolist(), ys[grazing].tolist(), kinds[grazing].tolist()):
+                self.events.emit('feeding', ANIMAL_NAMES[code], x, y)
+
+        starved = self.hunger[slots] >= HUNGER_LIMIT[kinds]
+        dead = starved | (self.age[slots] >= AGE_LIMIT[kinds])
+        self.alive[slots[dead]] = False
+        self.animal_layer[ys[dead], xs[dead]] = -1
+        self.kind_layer[ys[dead], xs[dead]] = 0
+        if self.events.death:
+            for x, y, code, hungry in zip(xs[dead].tolist(), ys[dead].tolist(), kinds[dead].tolist(),
+                                          starved[dead].tolist()):
+                self.events.emit('death', ANIMAL_NAMES[code], x, y, detail='hunger' if hungry else 'old age')
+        for lifetime, hungry in zip(self.lifetime[slots[dead]].tolist(), starved[dead].tolist()):
+            self.ledger.death(lifetime, 'hunger' if hungry else 'old age')
+        return slots
+
+    def _hunt(self, slot, prey_codes):
+        """Eat the first orthogonal neighbor whose code is in prey_codes"""
+        x, y = int(self.xs[slot]), int(self.ys[slot])
+        for dx, dy in NEIGHBOR_OFFSETS:
+            new_x, new_y = x + dx, y + dy
+            if self.is_valid_position(new_x, new_y) and self.kind_layer[new_y, new_x] in prey_codes:
+                if self.events.predation:
+                    self.events.emit('predation', ANIMAL_NAMES[self.kind[slot]], x, y, new_x, new_y,
+                                     ANIMAL_NAMES[self.kind_layer[new_y, new_x]])
+                prey = self.animal_layer[new_y, new_x]
+                self.ledger.death(int(self.lifetime[prey]), 'eaten')
+                self._remove(prey)
+                self.hunger[slot] = 0
+                return True
+        return False
+
+    def update_animals(self):
+        """Update all animals based on their genes and vision"""
+        # Like Grid, the later phases visit the cells animals occupied at the
+        # start of the step and act on whoever is there when the cell comes up
+        metrics = self.metrics
+        metrics.start_step()
+        vision_calls = hunts = moves_attempted = moves_failed = births = kills = 0
+        slots = self.age_and_cull()
+        cells = list(zip(self.xs[slots].tolist(), self.ys[slots].tolist()))
+        self.compact()
+        self.rng.shuffle(cells)
+        metrics.end_phase('aging')
+
+        # Then handle reproduction
+        snapshot = self.vision_snapshot(cells)
+        for x, y in cells:
+            slot = self.animal_layer[y, x]
+            if slot < 0:
+                continue
+            animal_type = ANIMAL_NAMES[self.kind[slot]]
+            hunger_limit = HUNGER_DEATH[animal_type] / 2
+
+            # Skip reproduction if too hungry (hunger >= 50% of max)
+            if self.hunger[slot] >= hunger_limit:
+                continue
+
+            # Decrease reproduction cooldown if it's active
+            if self.cooldown[slot] > 0:
+                self.cooldown[slot] -= 1
+                continue
+
+            vision_key = snapshot[slot] if snapshot is not None else self.get_vision_key(x, y, animal_type)
+            vision_calls += 1
+            if vision_key[OWN_KEY_COLUMN[self.kind[slot]]] != 1:
+                continue
+
+            other_parent = self.find_parent_nearby(x, y, animal_type)
+            if (other_parent is None or
+                    self.cooldown[other_parent] > 0 or
+                    self.hunger[other_parent] >= hunger_limit):
+                continue
+
+            empty_neighbors = [(x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS if self.is_empty(x + dx, y + dy)]
+            if empty_neighbors:
+                offspring_x, offspring_y = self.rng.choice(empty_neighbors)
+                self.create_offspring(offspring_x, offspring_y, slot, other_parent, animal_type)
+                if self.events.birth:
+                    self.events.emit('birth', animal_type, offspring_x, offspring_y, x, y)
+                cooldown = REPRODUCTION_COOLDOWNS[animal_type]
+                self.cooldown[slot] = cooldown
+                self.cooldown[other_parent] = cooldown
+                self.offspring[slot] += 1
+                self.offspring[other_parent] += 1
+                self.ledger.mated(int(self.lifetime[slot]), int(self.lifetime[other_parent]))
+                births += 1
+        metrics.end_phase('reproduction')
+
+        # Hungry omnivores eat an adjacent herbivore, then hungry carnivores
+        # eat an adjacent herbivore or omnivore. Newborns hunt too, as in Grid.
+        for code, prey_codes, phase in ((OMNIVORE, (HERBIVORE,), 'omnivore_predation'),
+                                        (CARNIVORE, (HERBIVORE, OMNIVORE), 'carnivore_predation')):
+            hunger_limit = HUNGER_LIMIT[code] / 2
+            for slot in self.living_slots(code).tolist():
+                if self.alive[slot] and self.hunger[slot] >= hunger_limit:
+                    hunts += 1
+                    kills += self._hunt(slot, prey_codes)
+            metrics.end_phase(phase)
+
+        # Then proceed with normal movement
+        snapshot = self.vision_snapshot(cells)
+        for x, y in cells:
+            slot = self.animal_layer[y, x]
+            if slot < 0:
+                continue
+            animal_type = ANIMAL_NAMES[self.kind[slot]]
+            vision_key = snapshot[slot] if snapshot is not None else self.get_vision_key(x, y, animal_type)
+            vision_calls += 1
+            action = self.genomes[self.genome[slot]][vision_key]
+
+            # Force random move if stayed still too long
+            forced = self.stationary[slot] >= 3
+            if forced:
+                action = Action.RANDOM_MOVE
+
+            # STAY is only valid if the same type is at distance 1
+            if action == Action.STAY and vision_key[OWN_KEY_COLUMN[self.kind[slot]]] != 1:
+                action = Action.RANDOM_MOVE
+
+            new_x, new_y = x, y
+            if action == Action.RANDOM_MOVE:
+                new_x, new_y = self.random_move(x, y)
+            elif action != Action.STAY:
+                target = self.find_closest_of_type(x, y, vision_key, ACTION_TARGETS[action])
+                if target:
+                    if action in FLEE_ACTIONS:
+                        new_x, new_y = self.move_away(x, y, *target)
+                    else:
+                        new_x, new_y = self.move_towards(x, y, *target)
+
+            attempted = (new_x, new_y) != (x, y)
+            moved = attempted and self.apply_move(x, y, new_x, new_y, animal_type)
+            if moved:
+                self.stationary[slot] = 0  # Reset counter on successful move
+            else:
+                self.stationary[slot] += 1
+            moves_attempted += attempted
+            moves_failed += attempted and not moved
+
+            if self.events.movement:
+                destination = (new_x, new_y) if moved else (x, y)
+                self.events.emit('movement', animal_type, x, y, *destination,
+                                 f"{action.name} (forced)" if forced else action.name)
+        metrics.end_phase('movement')
+        metrics.end_step(vision_calls=vision_calls, hunts=hunts, moves_attempted=moves_attempted,
+                         moves_failed=moves_failed, births=births, kills=kills)
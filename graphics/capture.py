@@ -0,0 +1,135 @@
+import os
+import queue
+import multiprocessing
+
+import numpy as np
+
+from config import GRID_WIDTH, GRID_HEIGHT
+
+# A frame stores one byte per cell: bit 0 is set for a plant, bits 1-2 hold
+# the animal (0 none, then the index in ANIMAL_CODES plus one)
+PLANT_BIT = 1
+ANIMAL_CODES = ('omnivore', 'carnivore', 'herbivore')
+
+
+class FrameView:
+    """The parts of a grid the renderer draws, decoded from a frame"""
+
+    def __init__(self, plants, omnivores, carnivores, herbivores):
+        self.plants = plants
+        self.omnivores = omnivores
+        self.carnivores = carnivores
+        self.herbivores = herbivores
+
+
+def encode_frame(grid, width, height):
+    """Pack what every cell shows into width * height bytes"""
+    cells = np.zeros(width * height, dtype=np.uint8)
+    if grid.plants:
+        cells[np.fromiter((y * width + x for x, y in grid.plants), dtype=np.int64)] = PLANT_BIT
+    for code, positions in enumerate((grid.omnivores, grid.carnivores, grid.herbivores), 1):
+        if positions:
+            cells[np.fromiter((y * width + x for x, y in positions), dtype=np.int64)] |= code << 1
+    return cells.tobytes()
+
+
+def decode_frame(data, width):
+    """Turn the bytes of encode_frame back into position sets"""
+    cells = np.frombuffer(data, dtype=np.uint8)
+
+    def positions(mask):
+        ys, xs = np.divmod(np.flatnonzero(mask), width)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    animals = cells >> 1
+    return FrameView(positions(cells & PLANT_BIT),
+                     *(positions(animals == code) for code in range(1, len(ANIMAL_CODES) + 1)))
+
+
+def capture_worker(frames, directory, grid_width, grid_height, image_format):
+    """Render the frames from a queue until it yields None (runs in its own process)"""
+    # No window, the renderer draws into an off-screen display
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    import pygame
+    from graphics.renderer import Renderer
+
+    os.makedirs(directory, exist_ok=True)
+    renderer = Renderer(grid_width, grid_height, fps=0, splash=False)
+    raw_files = {}
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+        generation, simulation, step, data = frame
+        renderer.draw(decode_frame(data, grid_width), generation, simulation, step, force=True)
+        name = f"gen{generation:03d}_sim{simulation:04d}"
+        if image_format == 'png':
+            pygame.image.save(renderer.screen, os.path.join(directory, f"{name}_step{step:04d}.png"))
+        else:
+            if name not in raw_files:
+                raw_files[name] = open(os.path.join(directory, f"{name}.rgb"), 'wb')
+            raw_files[name].write(pygame.image.tobytes(renderer.screen, 'RGB'))
+    for f in raw_files.values():
+        f.close()
+    pygame.quit()
+
+
+class FrameCapture:
+    """Records simulations to image files without a window.
+
+    Pass it to run_simulation in place of a renderer. Every `every`-th step
+    is packed into a one byte per cell frame and put on a bounded queue to a
+    separate process, which draws it with graphics.renderer.Renderer under
+    the SDL dummy video driver and writes it to `directory`:
+
+    - 'png': one gen<g>_sim<s>_step<n>.png per frame
+    - 'raw': the RGB24 frames of every simulation appended to gen<g>_sim<s>.rgb,
+      each GRID_WIDTH * CELL_SIZE by GRID_HEIGHT * CELL_SIZE pixels, e.g. for
+      ffmpeg -f rawvideo -pix_fmt rgb24
+
+    The simulation never waits for the encoder: when the queue is full the
+    new frame is dropped and counted in `dropped`. Call close() to finish
+    writing the queued frames.
+    """
+
+    def __init__(self, directory, every=1, image_format='png', queue_size=64,
+                 grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT):
+        if image_format not in ('png', 'raw'):
+            raise ValueError(f"Unknown capture format: {image_format} (use png or raw)")
+        self.every = every
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.captured = 0
+        self.dropped = 0
+        # Spawn, so the renderer process starts clean of the simulation's threads
+        context = multiprocessing.get_context('spawn')
+        self.frames = context.Queue(queue_size)
+        self.process = context.Process(target=capture_worker, daemon=True,
+                                       args=(self.frames, directory, grid_width, grid_height, image_format))
+        self.process.start()
+
+    def handle_events(self):
+        pass
+
+    def show_message(self, text, wait_ms=1000):
+        pass
+
+    def draw(self, grid, generation, simulation, step, force=False):
+        """Queue a frame of the grid, or drop it if the renderer process is behind"""
+        if step % self.every and not force:
+            return
+        frame = (generation, simulation, step, encode_frame(grid, self.grid_width, self.grid_height))
+        try:
+            self.frames.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.captured += 1
+
+    def close(self):
+        """Wait until the queued frames are written and stop the renderer process"""
+        if self.process is None:
+            return
+        self.frames.put(None)
+        self.process.join()
+        self.process = None
@@ -1,7 +1,6 @@
-import pygame
-import os
 from datetime import datetime
-from config import SQUARE_SIZE  # Remove the dot
+from config import SQUARE_SIZE
+from graphics.sprites import get_sprite
 
 def log_error(message):
     with open("graphics_error.log", "a") as f:
@@ -16,23 +15,10 @@ class Carnivore:
         self.direction = 'right'
         self.prev_x = x
         
-        # Load the carnivore image
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        image_path = os.path.join(script_dir, 'assets', 'carnivore.png')
-        
-        with open("image_loading.log", "a") as log:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log.write(f"\n[{timestamp}] Attempting to load carnivore image from: {image_path}\n")
-            
-            try:
-                self.base_image = pygame.image.load(image_path).convert_alpha()
-                self.base_image = pygame.transform.scale(self.base_image, (self.size, self.size))
-                self.image = self.base_image
-                self.has_image = True
-                log.write(f"[{timestamp}] Successfully loaded carnivore image\n")
-            except Exception as e:
-                self.has_image = False
-                log.write(f"[{timestamp}] Failed to load carnivore image: {str(e)}\n")
+        # Sprites come from the shared registry instead of being loaded per instance
+        self.base_image = get_sprite('carnivore')
+        self.image = self.base_image
+        self.has_image = self.base_image is not None
 
     def update(self):
         if self.x != self.prev_x:
@@ -41,7 +27,7 @@ class Carnivore:
                 self.image = self.base_image
             else:
                 self.direction = 'left'
-                self.image = pygame.transform.flip(self.base_image, True, False)
+                self.image = get_sprite('carnivore', flipped=True)
             self.prev_x = self.x
 
     def draw(self, surface):
@@ -1,7 +1,6 @@
-import pygame
-import os
 from datetime import datetime
 from config import SQUARE_SIZE
+from graphics.sprites import get_sprite
 
 def log_error(message):
     with open("graphics_error.log", "a") as f:
@@ -10,38 +9,16 @@ def log_error(message):
 
 class Herbivore:
     def __init__(self, x, y):
-        print("Initializing Herbivore...")
         self.x = x
         self.y = y
         self.size = 45
         self.direction = 'right'
         self.prev_x = x
         
-        # Load the herbivore image
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        image_path = os.path.join(script_dir, 'assets', 'herbivore.png')
-        
-        print(f"Current working directory: {os.getcwd()}")
-        try:
-            with open("image_loading.log", "a") as log:
-                log.write("\nTesting log file creation")
-            print("Successfully created log file")
-        except Exception as e:
-            print(f"Failed to create log file: {e}")
-            
-            with open("image_loading.log", "a") as log:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                log.write(f"\n[{timestamp}] Attempting to load herbivore image from: {image_path}\n")
-                
-                try:
-                    self.base_image = pygame.image.load(image_path).convert_alpha()
-                    self.base_image = pygame.transform.scale(self.base_image, (self.size, self.size))
-                    self.image = self.base_image
-                    self.has_image = True
-                    log.write(f"[{timestamp}] Successfully loaded herbivore image\n")
-                except Exception as e:
-                    self.has_image = False
-                    log.write(f"[{timestamp}] Failed to load herbivore image: {str(e)}\n")
+        # Sprites come from the shared registry instead of being loaded per instance
+        self.base_image = get_sprite('herbivore')
+        self.image = self.base_image
+        self.has_image = self.base_image is not None
 
     def update(self):
         if self.x != self.prev_x:
@@ -50,7 +27,7 @@ class Herbivore:
                 self.image = self.base_image
             else:
                 self.direction = 'left'
-                self.image = pygame.transform.flip(self.base_image, True, False)
+                self.image = get_sprite('herbivore', flipped=True)
             self.prev_x = self.x
 
     def draw(self, surface):
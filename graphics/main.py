@@ -1,10 +1,11 @@
 import pygame
 import random
-from omnivore import Omnivore
-from herbivore import Herbivore
-from plant import Plant
-from carnivore import Carnivore
-from ground import Ground
+from graphics.omnivore import Omnivore
+from graphics.herbivore import Herbivore
+from graphics.plant import Plant
+from graphics.carnivore import Carnivore
+from graphics.ground import Ground
+from graphics.sprites import get_sprite
 from config import *
 
 # Initialize Pygame
@@ -147,19 +148,19 @@ def draw_animals(grid):
             if grid.grid[y][x]:
                 screen_x = x * CELL_SIZE - (45 - CELL_SIZE) // 2  # Center 45px sprite on 30px grid
                 screen_y = y * CELL_SIZE - (45 - CELL_SIZE) // 2
-                screen.blit(CACHED_IMAGES['omnivore'], (screen_x, screen_y))
+                screen.blit(get_sprite('omnivore'), (screen_x, screen_y))
         
         for x, y in grid.carnivores:
             if grid.grid[y][x]:
                 screen_x = x * CELL_SIZE - (45 - CELL_SIZE) // 2
                 screen_y = y * CELL_SIZE - (45 - CELL_SIZE) // 2
-                screen.blit(CACHED_IMAGES['carnivore'], (screen_x, screen_y))
+                screen.blit(get_sprite('carnivore'), (screen_x, screen_y))
         
         for x, y in grid.herbivores:
             if grid.grid[y][x]:
                 screen_x = x * CELL_SIZE - (45 - CELL_SIZE) // 2
                 screen_y = y * CELL_SIZE - (45 - CELL_SIZE) // 2
-                screen.blit(CACHED_IMAGES['herbivore'], (screen_x, screen_y))
+                screen.blit(get_sprite('herbivore'), (screen_x, screen_y))
 
 while running:
     dt = clock.tick(60) / 1000.0  # Delta time in seconds
@@ -3,6 +3,12 @@ import math
 import random
 import os
 
+from graphics.sprites import SPRITE_SIZE
+
+# Pre-rendered looks for PlantAtlas: variants times sway phases
+PLANT_VARIANTS = 6
+SWAY_FRAMES = 8
+
 # Updated colors for a more natural look
 DARK_GREEN = (25, 77, 30)     # Darker base green
 MID_GREEN = (39, 89, 45)      # Medium green for main blades
@@ -97,10 +103,12 @@ class Plant:
     def draw(self, surface):
         base_x = self.grid_x * 30 - (self.size - 30) // 2
         base_y = self.grid_y * 30 - (self.size - 30) // 2
-        
+        self.draw_at(surface, base_x + self.size//2, base_y + self.size//2)
+
+    def draw_at(self, surface, center_x, center_y):
         for cluster in self.clusters:
-            cluster_x = base_x + self.size//2 + cluster['x']
-            cluster_y = base_y + self.size//2 + cluster['y']
+            cluster_x = center_x + cluster['x']
+            cluster_y = center_y + cluster['y']
             
             # Draw shadow/base
             pygame.draw.circle(surface, VERY_DARK_GREEN, 
@@ -147,4 +155,33 @@ class Plant:
                                         (int(petal_x), int(petal_y)), 2)
                     # Yellow center
                     pygame.draw.circle(surface, (255, 223, 0),
-                                    (int(end.x), int(end.y)), 1) 
\ No newline at end of file
+                                    (int(end.x), int(end.y)), 1)
+
+
+class PlantAtlas:
+    """A few plant variants in a few sway phases, pre-rendered into one surface.
+
+    Drawing a Plant evaluates a bezier curve for every blade, which is far
+    too slow for a board full of plants. The atlas draws every variant in
+    every phase once; after that drawing a plant is a single blit of
+    rects[index] from surface.
+    """
+
+    def __init__(self, variants=PLANT_VARIANTS, frames=SWAY_FRAMES, size=SPRITE_SIZE):
+        self.variants = variants
+        self.frames = frames
+        self.size = size
+        self.surface = pygame.Surface((frames * size, variants * size), pygame.SRCALPHA)
+        # Sprite i is frame i % frames of variant i // frames
+        self.rects = []
+        for variant in range(variants):
+            plant = Plant(0, 0)
+            for frame in range(frames):
+                plant.sway_time = 2 * math.pi * frame / frames
+                rect = pygame.Rect(frame * size, variant * size, size, size)
+                # Blades reaching past the tile are clipped by the subsurface
+                plant.draw_at(self.surface.subsurface(rect), size // 2, size // 2)
+                self.rects.append(rect)
+
+    def __len__(self):
+        return len(self.rects)
@@ -0,0 +1,241 @@
+import sys
+import time
+import random
+import pygame
+
+from config import GRID_WIDTH, GRID_HEIGHT, CELL_SIZE, SIMULATION_STEPS, TARGET_FPS, SPLASH_SCREENS, WHITE, BLACK
+from graphics.ground import Ground
+from graphics.plant import PlantAtlas
+from graphics.sprites import SPRITE_SIZE, get_sprite
+
+# Animals are drawn in this order, so herbivores end up on top
+ANIMAL_LAYERS = ('omnivore', 'carnivore', 'herbivore')
+
+# Above this share of changed cells a full redraw is cheaper than patching
+FULL_REDRAW_FRACTION = 0.2
+
+# A plant moves on to its next sway frame every this many steps. Plants are
+# spread over the phases, so only a few of them change on any one step.
+SWAY_STEPS = 8
+
+
+class FrameScheduler:
+    """Decides which simulation steps get drawn.
+
+    The simulation never waits for the display. A step is drawn when at
+    least 1/fps seconds passed since the last drawn frame, otherwise its
+    frame is dropped, so the window always shows the latest state at about
+    the target rate. With fps None or 0 every step is drawn.
+    """
+
+    def __init__(self, fps=TARGET_FPS):
+        self.interval = 1 / fps if fps else 0
+        self.next_frame = 0
+        self.drawn = 0
+        self.dropped = 0
+
+    def due(self, force=False):
+        """Whether to draw now, counting the frame as drawn or dropped"""
+        now = time.perf_counter()
+        if force or now >= self.next_frame:
+            self.next_frame = now + self.interval
+            self.drawn += 1
+            return True
+        self.dropped += 1
+        return False
+
+
+class Renderer:
+    """Draws a running simulation into a pygame window.
+
+    The simulation engine never imports pygame itself; it only calls into a
+    renderer when one is passed to run_simulation.
+
+    The terrain and grid lines are rendered once into a background surface
+    and plants come from a pre-rendered PlantAtlas, each cell showing a fixed
+    variant that sways with its own phase.
+    Each frame compares what every cell shows with the previous frame and
+    only repaints the changed cells (plus the counter text), passing those
+    rectangles to pygame.display.update. When most of the board changed it
+    falls back to a full redraw.
+
+    Steps are drawn at most fps times per second (see FrameScheduler) and
+    the splash messages between simulations can be turned off.
+    """
+
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, cell_size=CELL_SIZE,
+                 fps=TARGET_FPS, splash=SPLASH_SCREENS):
+        self.scheduler = FrameScheduler(fps)
+        self.splash = splash
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.cell_size = cell_size
+        self.window_width = grid_width * cell_size
+        self.window_height = grid_height * cell_size
+
+        pygame.init()
+        pygame.font.init()  # Initialize the font module
+        self.font = pygame.font.SysFont('Arial', 24)
+
+        self.screen = pygame.display.set_mode((self.window_width, self.window_height))
+        pygame.display.set_caption("Grid Display")
+
+        # Create static grid surface once
+        self.grid_surface = pygame.Surface((self.window_width, self.window_height), pygame.SRCALPHA)
+        for x in range(0, self.window_width, cell_size):
+            pygame.draw.line(self.grid_surface, (*BLACK, 40), (x, 0), (x, self.window_height))
+        for y in range(0, self.window_height, cell_size):
+            pygame.draw.line(self.grid_surface, (*BLACK, 40), (0, y), (self.window_width, y))
+
+        # Terrain and grid lines never change, render them once
+        self.background = pygame.Surface((self.window_width, self.window_height))
+        Ground(grid_width, grid_height, cell_size).draw(self.background)
+        self.background.blit(self.grid_surface, (0, 0))
+
+        # What the window currently shows, None when it needs a full redraw
+        self.scene = None
+        # Sprites hang over the edges of their cell by this much
+        self.overhang = (SPRITE_SIZE - cell_size) // 2
+        self.plants = PlantAtlas(size=SPRITE_SIZE)
+        # Every cell gets a fixed plant variant (its first sprite index) and
+        # sway phase, so a plant keeps its look while it lives
+        sway_cycle = SWAY_STEPS * self.plants.frames
+        self.plant_looks = {(x, y): (random.randrange(self.plants.variants) * self.plants.frames,
+                                     random.randrange(sway_cycle))
+                            for x in range(grid_width) for y in range(grid_height)}
+        self.counter_rect = pygame.Rect(0, 0, 0, 0)
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+
+    def flip(self):
+        pygame.display.flip()
+
+    def show_message(self, text, wait_ms=1000):
+        """Show a centered message on a blank screen, unless splash screens are off"""
+        if not self.splash:
+            return
+        self.screen.fill(WHITE)
+        text_surface = self.font.render(text, True, BLACK)
+        text_rect = text_surface.get_rect(center=(self.window_width // 2, self.window_height // 2))
+        self.screen.blit(text_surface, text_rect)
+        pygame.display.flip()
+        self.scene = None
+        pygame.time.wait(wait_ms)
+
+    def draw(self, grid, generation, simulation, step, force=False):
+        """Draw one simulation step, unless its frame is dropped. Pass force
+        to draw it regardless, e.g. for the final state."""
+        if not self.scheduler.due(force):
+            return
+        self.handle_events()
+
+        scene = self.scene_of(grid, step)
+        if self.scene is None:
+            self.draw_full(scene, generation, simulation, step)
+        else:
+            changed = [cell for cell in scene.keys() | self.scene.keys()
+                       if scene.get(cell) != self.scene.get(cell)]
+            if len(changed) > FULL_REDRAW_FRACTION * self.grid_width * self.grid_height:
+                self.draw_full(scene, generation, simulation, step)
+            else:
+                self.draw_changes(scene, changed, generation, simulation, step)
+        self.scene = scene
+
+    def scene_of(self, grid, step):
+        """What every occupied cell shows: cell -> (plant sprite index or None, animal_type or None)"""
+        frames = self.plants.frames
+        looks = self.plant_looks
+        scene = {}
+        for cell in grid.plants:
+            first, phase = looks[cell]
+            scene[cell] = (first + (step + phase) // SWAY_STEPS % frames, None)
+        for animal_type, positions in zip(ANIMAL_LAYERS, (grid.omnivores, grid.carnivores, grid.herbivores)):
+            for cell in positions:
+                plant = scene[cell][0] if cell in scene else None
+                scene[cell] = (plant, animal_type)
+        return scene
+
+    def draw_full(self, scene, generation, simulation, step):
+        """Repaint the whole window"""
+        self.draw_grid()
+        self.draw_cells(scene, sorted(scene))
+        self.draw_simulation_counter(generation, simulation, step)
+        pygame.display.flip()
+
+    def draw_changes(self, scene, changed, generation, simulation, step):
+        """Repaint only the changed cells and the counter text"""
+        old_counter_rect = self.counter_rect
+        rects = [self.cell_rect(x, y) for x, y in changed]
+        for rect in rects:
+            self.repaint(scene, rect)
+
+        # The counter changes every step, repaint what is under it first
+        self.repaint(scene, old_counter_rect)
+        self.draw_simulation_counter(generation, simulation, step)
+        rects.append(old_counter_rect.union(self.counter_rect))
+        pygame.display.update(rects)
+
+    def cell_rect(self, x, y):
+        """The window area the contents of a cell can cover"""
+        return pygame.Rect(x * self.cell_size - self.overhang, y * self.cell_size - self.overhang,
+                           SPRITE_SIZE, SPRITE_SIZE)
+
+    def repaint(self, scene, rect):
+        """Restore the background in rect and redraw every cell reaching into it"""
+        self.screen.set_clip(rect)
+        self.screen.blit(self.background, rect, rect)
+        # Cells whose sprites can reach into rect
+        size = self.cell_size
+        x0 = max(0, (rect.left + self.overhang - SPRITE_SIZE) // size + 1)
+        x1 = min(self.grid_width - 1, -(-(rect.right + self.overhang) // size) - 1)
+        y0 = max(0, (rect.top + self.overhang - SPRITE_SIZE) // size + 1)
+        y1 = min(self.grid_height - 1, -(-(rect.bottom + self.overhang) // size) - 1)
+        cells = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in scene]
+        self.draw_cells(scene, cells)
+        self.screen.set_clip(None)
+
+    def draw_cells(self, scene, cells):
+        """Draw the plants and then the animals of some cells, layer by layer.
+
+        Sprites of neighboring cells overlap, so cells must come in sorted
+        order for a repaint to match a full redraw.
+        """
+        size = self.cell_size
+        offset = self.overhang
+        atlas, areas = self.plants.surface, self.plants.rects
+        layers = {animal_type: [] for animal_type in ANIMAL_LAYERS}
+        blits = []
+        for x, y in cells:
+            plant, animal_type = scene[(x, y)]
+            position = (x * size - offset, y * size - offset)
+            if plant is not None:
+                blits.append((atlas, position, areas[plant]))
+            if animal_type is not None:
+                layers[animal_type].append(position)
+        for animal_type, positions in layers.items():
+            sprite = get_sprite(animal_type)
+            if sprite is not None:
+                blits.extend((sprite, position) for position in positions)
+        self.screen.blits(blits, doreturn=False)
+
+    def draw_grid(self):
+        # Terrain and grid lines, pre-rendered at startup
+        self.screen.blit(self.background, (0, 0))
+
+    def draw_simulation_counter(self, generation, simulation, step=None, total_steps=SIMULATION_STEPS):
+        """Draw the current generation, simulation numbers and time progress"""
+        gen_sim_text = f"Generation: {generation + 1}, Simulation: {simulation + 1}"
+        text_surface = self.font.render(gen_sim_text, True, BLACK)
+        self.screen.blit(text_surface, (10, 10))  # Position in top-left corner
+        self.counter_rect = text_surface.get_rect(topleft=(10, 10))
+
+        if step is not None:
+            # Add progress information
+            progress_text = f"Step: {step}/{total_steps} ({(step/total_steps*100):.1f}%)"
+            progress_surface = self.font.render(progress_text, True, BLACK)
+            self.screen.blit(progress_surface, (10, 40))  # Position below generation/simulation counter
+            self.counter_rect = self.counter_rect.union(progress_surface.get_rect(topleft=(10, 40)))
@@ -0,0 +1,40 @@
+import os
+import pygame
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+SPRITE_SIZE = 45  # Sprites are 1.5x a grid cell
+
+# Process-wide sprite registry, keyed by (animal_type, flipped). Every sprite
+# is read from disk at most once and shared by all animals of that type.
+_SPRITES = {}
+
+
+def load_sprite(animal_type):
+    """Load and scale the sprite for an animal type, or None if it is missing"""
+    image_path = os.path.join(ASSETS_DIR, f'{animal_type}.png')
+    try:
+        image = pygame.image.load(image_path)
+    except Exception as e:
+        print(f"Failed to load {animal_type} image: {e}")
+        return None
+    # convert_alpha() needs a video mode; skip it when nothing has been set up yet
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()
+    return pygame.transform.scale(image, (SPRITE_SIZE, SPRITE_SIZE))
+
+
+def get_sprite(animal_type, flipped=False):
+    """Return the shared sprite for an animal type, loading it on first use"""
+    key = (animal_type, flipped)
+    if key not in _SPRITES:
+        if flipped:
+            base = get_sprite(animal_type)
+            _SPRITES[key] = pygame.transform.flip(base, True, False) if base else None
+        else:
+            _SPRITES[key] = load_sprite(animal_type)
+    return _SPRITES[key]
+
+
+def clear_sprites():
+    """Forget all loaded sprites, e.g. after the display mode changed"""
+    _SPRITES.clear()
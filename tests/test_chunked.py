@@ -0,0 +1,29 @@
+import contextlib
+import io
+
+from engine.metrics import StepMetrics
+from engine.simulation import create_world, run_simulation
+from tests.test_snapshot import fingerprint
+
+
+def test_chunked_matches_grid():
+    """The same seed gives the same simulation, step for step, on a map that
+    ends in partial chunks on both sides"""
+    runs = {}
+    for backend in ('grid', 'chunked'):
+        metrics = StepMetrics()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_simulation(backend=backend, seed=11, metrics=metrics, width=37, height=29)
+        counts = [{name: step[name] for name in ('vision_calls', 'moves_attempted', 'moves_failed', 'births',
+                                                 'kills')} for step in metrics.steps]
+        runs[backend] = (fingerprint(results), counts)
+
+    assert runs['chunked'] == runs['grid']
+
+
+def test_chunked_world_matches_grid_world():
+    grid, _ = create_world(backend='grid', seed=5, width=70, height=50)
+    chunked, _ = create_world(backend='chunked', seed=5, width=70, height=50)
+    assert chunked.plants == grid.plants
+    for animal_type in ('herbivores', 'carnivores', 'omnivores'):
+        assert getattr(chunked, animal_type) == getattr(grid, animal_type)
@@ -0,0 +1,30 @@
+import contextlib
+import io
+
+from engine.simulation import create_world, run_simulation
+from engine.world import ArrayGrid
+from tests.test_snapshot import fingerprint
+
+
+def test_compaction_keeps_the_results(monkeypatch):
+    with contextlib.redirect_stdout(io.StringIO()):
+        compacted = run_simulation(backend='array', seed=5, width=40, height=30)
+        monkeypatch.setattr(ArrayGrid, 'compact', lambda self: None)
+        kept = run_simulation(backend='array', seed=5, width=40, height=30)
+
+    assert fingerprint(compacted) == fingerprint(kept)
+
+
+def test_slots_and_genomes_stay_bounded():
+    grid, _ = create_world(backend='array', seed=5, width=40, height=30)
+    for _ in range(60):
+        grid.update_plants()
+        grid.update_animals()
+
+    # Dead animals gave up their slots and genomes, the ledger still has them
+    assert grid.count < grid.ledger.count
+    assert len(grid.genomes) <= grid.count
+    assert grid.genome[:grid.count].max() < len(grid.genomes)
+    slots = grid.living_slots()
+    assert (grid.animal_layer[grid.ys[slots], grid.xs[slots]] == slots).all()
+    assert (grid.animal_layer >= 0).sum() == len(slots)
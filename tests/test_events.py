@@ -0,0 +1,43 @@
+import contextlib
+import io
+
+import pytest
+
+from engine.events import CATEGORIES, BinarySink, EventLog, open_sink, read_binary_events
+from engine.simulation import run_simulation
+
+
+class RecordingSink:
+    """Keeps a copy of every event before handing it on to another sink"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.events = []
+
+    def write(self, events):
+        self.events.extend(events)
+        self.sink.write(events)
+
+    def close(self):
+        self.sink.close()
+
+
+def test_binary_events_round_trip(tmp_path):
+    path = str(tmp_path / 'events.bin')
+    sink = RecordingSink(open_sink(path))
+    assert isinstance(sink.sink, BinarySink)
+    # Small batches, so the string table is spread over many writes
+    events = EventLog(sink, level='debug', batch_size=64)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_simulation(backend='grid', seed=11, events=events, simulation=3, width=40, height=30)
+    events.close()
+
+    assert {event.category for event in sink.events} == set(CATEGORIES)
+    assert read_binary_events(path) == sink.events
+
+
+def test_binary_events_reject_other_files(tmp_path):
+    path = tmp_path / 'events.bin'
+    path.write_bytes(b'not an event log')
+    with pytest.raises(ValueError):
+        read_binary_events(str(path))
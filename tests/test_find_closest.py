@@ -0,0 +1,49 @@
+import pytest
+
+from config import ANIMAL_TYPES, PLANT_TYPE, VISION_RADIUS
+from engine.animal import Animal
+from engine.benchmark import populated_grid
+from engine.stencils import vision_stencil
+
+TARGETS = [PLANT_TYPE] + list(ANIMAL_TYPES)
+
+
+def brute_force_closest(grid, x, y, target_type):
+    """The original row-major window scan, with the searcher's own radius
+    as the window and the limit, and its own cell left out"""
+    searcher = grid.grid[y][x]
+    radius = VISION_RADIUS[searcher.animal_type] if isinstance(searcher, Animal) else max(VISION_RADIUS.values())
+    closest_dist = float('inf')
+    closest_pos = None
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            new_x, new_y = x + dx, y + dy
+            if (dx, dy) == (0, 0) or not grid.is_valid_position(new_x, new_y):
+                continue
+            cell = grid.grid[new_y][new_x]
+            if cell is None:
+                continue
+            cell_type = cell.animal_type if isinstance(cell, Animal) else cell
+            if cell_type == target_type:
+                dist = grid.calculate_distance(x, y, new_x, new_y)
+                if dist <= radius and dist < closest_dist:
+                    closest_dist = dist
+                    closest_pos = (new_x, new_y)
+    return closest_pos
+
+
+@pytest.mark.parametrize('density', [0.05, 0.2, 0.4])
+def test_find_closest_matches_the_window_scan(density):
+    grid = populated_grid('grid', 30, 15, density, seed=7)
+    world = populated_grid('array', 30, 15, density, seed=7)
+    for y in range(grid.height):
+        for x in range(grid.width):
+            searcher = grid.grid[y][x]
+            radius = VISION_RADIUS[searcher.animal_type] if isinstance(searcher, Animal) else max(VISION_RADIUS.values())
+            for target_type in TARGETS:
+                expected = brute_force_closest(grid, x, y, target_type)
+                # Both the stencil walk and the spatial index, whichever find_closest_of_type picks
+                assert grid.scan_closest_of_type(x, y, target_type, vision_stencil(radius)) == expected
+                assert grid.index.nearest(x, y, target_type, radius) == expected
+                assert grid.find_closest_of_type(x, y, None, target_type) == expected
+                assert world.find_closest_of_type(x, y, None, target_type) == expected
@@ -0,0 +1,24 @@
+import numpy as np
+
+from config import ANIMAL_TYPES
+from engine.gene_bank import load_gene_bank, save_gene_bank
+from engine.genome import Genome, random_genome
+
+
+def test_gene_bank_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    pools = {animal_type: [random_genome(animal_type, rng) for _ in range(3)] for animal_type in ANIMAL_TYPES}
+    path = tmp_path / 'bank.npz'
+    save_gene_bank(path, pools)
+
+    loaded = load_gene_bank(path)
+    assert loaded == pools
+    assert all(isinstance(genome, Genome) for genomes in loaded.values() for genome in genomes)
+
+
+def test_gene_bank_accepts_gene_dicts_and_empty_pools(tmp_path):
+    genome = random_genome('carnivore', np.random.default_rng(1))
+    path = tmp_path / 'bank.npz'
+    save_gene_bank(path, {'carnivore': [genome.to_dict()], 'herbivore': []})
+
+    assert load_gene_bank(path) == {'carnivore': [genome], 'herbivore': []}
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from config import SIMULATION_STEPS
+from engine.ledger import Lifetime
+from engine.metrics import StepMetrics
+from engine.partition import GHOST, HALO, PartitionedWorld, StripGrid
+from engine.simulation import create_world
+
+
+def test_strips_hold_the_world_and_their_halo():
+    world, _ = create_world(backend='array', seed=2, width=40, height=30)
+    bounds = [(0, 10), (10, 20), (20, 30)]
+    strips = [StripGrid.from_world(world, first, last) for first, last in bounds]
+
+    lifetimes = []
+    for strip, (first, last) in zip(strips, bounds):
+        top, bottom = max(0, first - HALO), min(world.height, last + HALO)
+        assert np.array_equal(strip.plant_layer, world.plant_layer[top:bottom])
+        assert np.array_equal(strip.kind_layer, world.kind_layer[top:bottom])
+        for local, rows in strip.halo_rows():
+            assert np.array_equal(strip.animal_layer[local] == GHOST, world.kind_layer[rows] != 0)
+        lifetimes.extend(strip.lifetime[strip.living_slots()].tolist())
+    assert sorted(lifetimes) == sorted(world.lifetime[world.living_slots()].tolist())
+
+    # Publishing every strip's rows rebuilds the world's layers
+    plants, kinds = np.zeros_like(world.plant_layer), np.zeros_like(world.kind_layer)
+    for strip in strips:
+        strip.publish(plants, kinds)
+    assert np.array_equal(plants, world.plant_layer)
+    assert np.array_equal(kinds, world.kind_layer)
+
+
+def test_partitioned_world_scores_every_animal():
+    """Every animal that crossed between strips is scored once, like in a
+    single world"""
+    world, _ = create_world(backend='array', seed=11, width=40, height=30)
+    initial = world.animal_count()
+    partitioned = PartitionedWorld(world, 3, metrics_enabled=True)
+    population = []
+    try:
+        for _ in range(SIMULATION_STEPS):
+            partitioned.step()
+            population.append(partitioned.animal_count())
+            assert np.count_nonzero(partitioned.kinds) == population[-1]
+            if not population[-1]:
+                break
+        metrics = StepMetrics()
+        results = partitioned.results(metrics)
+    finally:
+        partitioned.close()
+
+    records = [record for record, _ in results]
+    births = sum(step['births'] for step in metrics.steps)
+    assert all(isinstance(record, Lifetime) for record in records)
+    assert len(records) == initial + births
+    assert sum(record.offspring_count for record in records) == 2 * births
+    assert sum(record.cause == 'eaten' for record in records) == sum(step['kills'] for step in metrics.steps)
+    assert sum(record.died is None for record in records) == population[-1]
+    # Every step an animal lived through counts once towards the survival times
+    assert sum(survival for _, survival in results) == sum(population)
+
+
+def test_worker_error_is_raised_after_every_reply():
+    world, _ = create_world(backend='array', seed=2, width=40, height=30)
+    partitioned = PartitionedWorld(world, 3)
+    try:
+        # A record without its columns fails in the first worker only
+        with pytest.raises(RuntimeError, match='Partition worker failed'):
+            partitioned.command('arrive', [[{'x': 0, 'y': 0}], [], []])
+        assert partitioned.memory is None
+        assert not any(process.is_alive() for process in partitioned.processes)
+    finally:
+        partitioned.close()
@@ -0,0 +1,37 @@
+import copy
+
+import pytest
+
+from engine.simulation import create_world
+
+
+def full_scan_frontier(grid):
+    """Plants with a free neighbor, found by visiting every plant"""
+    return {(x, y) for x, y in grid.plants if grid.get_empty_neighbors(x, y)}
+
+
+@pytest.mark.parametrize('backend', ['grid', 'chunked'])
+def test_frontier_matches_a_full_scan(backend):
+    grid, _ = create_world(backend=backend, seed=3, width=40, height=30)
+    for _ in range(40):
+        grid.update_plants()
+        grid.update_animals()
+        grid.update_plant_frontier()
+        assert grid.plant_frontier == full_scan_frontier(grid)
+
+
+def test_array_spread_matches_a_full_scan():
+    grid, _ = create_world(backend='array', seed=3, width=40, height=30)
+    for _ in range(40):
+        # Replay the draws of plant_spread on the plants of a full scan, in its row-major order
+        draws = copy.deepcopy(grid.rng.generator).random(len(full_scan_frontier(grid)))
+        frontier = sorted(full_scan_frontier(grid), key=lambda cell: (cell[1], cell[0]))
+        expected = []
+        for (x, y), draw in zip(frontier, draws.tolist()):
+            neighbors = grid.get_empty_neighbors(x, y)
+            expected.append(neighbors[int(draw * len(neighbors))])
+
+        ys, xs = grid.plant_spread()
+        assert list(zip(xs.tolist(), ys.tolist())) == expected
+        grid.plant_layer[ys, xs] = True
+        grid.update_animals()
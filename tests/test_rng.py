@@ -0,0 +1,18 @@
+import contextlib
+import io
+
+import pytest
+
+from engine.simulation import run_simulation
+from tests.test_snapshot import fingerprint
+
+
+@pytest.mark.parametrize('backend', ['grid', 'array'])
+def test_seeded_runs_replay(backend):
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = run_simulation(backend=backend, seed=11, width=40, height=30)
+        second = run_simulation(backend=backend, seed=11, width=40, height=30)
+        other = run_simulation(backend=backend, seed=12, width=40, height=30)
+
+    assert fingerprint(second) == fingerprint(first)
+    assert fingerprint(other) != fingerprint(first)
@@ -0,0 +1,28 @@
+import contextlib
+import io
+
+import pytest
+
+from engine import simulation
+from engine.simulation import run_simulation
+from engine.snapshot import load_snapshot
+
+
+def fingerprint(results):
+    """Everything a result says about every animal, genes as bytes"""
+    return [(record.animal_type, record.born, record.died, record.cause, record.offspring_count, survival,
+             None if record.genes is None else record.genes.codes.tobytes())
+            for record, survival in results]
+
+
+@pytest.mark.parametrize('backend', ['grid', 'array', 'chunked'])
+def test_resume_from_snapshot_is_exact(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(simulation, 'SNAPSHOT_INTERVAL', 20)
+    path = str(tmp_path / 'world.snapshot')
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = run_simulation(backend=backend, seed=11, snapshot_path=path, width=40, height=30)
+        snapshot = load_snapshot(path)
+        resumed = run_simulation(backend=backend, resume=snapshot)
+
+    assert snapshot['step'] > 0
+    assert fingerprint(resumed) == fingerprint(full)
@@ -0,0 +1,28 @@
+from config import ANIMAL_TYPES, VISION_RADIUS
+from engine.simulation import create_world
+from engine.vision_cache import VisionCache
+from tests.test_snapshot import fingerprint
+
+
+def visions(grid):
+    return {(x, y): grid.get_vision(x, y, animal_type)
+            for animal_type in ANIMAL_TYPES for x, y in sorted(getattr(grid, f'{animal_type}s'))}
+
+
+def test_cached_vision_matches_uncached():
+    plain, _ = create_world(backend='grid', seed=3, width=40, height=30)
+    cached, _ = create_world(backend='grid', seed=3, width=40, height=30)
+    assert plain.vision_cache is None
+    cached.vision_cache = VisionCache(VISION_RADIUS)
+
+    for step in range(40):
+        for grid in (plain, cached):
+            grid.ledger.step = step
+            grid.update_plants()
+            grid.update_animals()
+        # Twice, so the second pass is answered from the cache
+        assert visions(cached) == visions(plain)
+        assert visions(cached) == visions(plain)
+
+    assert cached.vision_cache.hits > 0
+    assert fingerprint(cached.ledger.results(40)) == fingerprint(plain.ledger.results(40))